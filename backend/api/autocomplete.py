@@ -0,0 +1,86 @@
+import threading
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+
+from recipes.cache import INGREDIENTS, get_version
+from recipes.models import Ingredient
+
+NGRAM = 3
+
+
+def normalize(text):
+    """Приводит строку к виду, в котором хранятся ключи индекса."""
+    return text.casefold().replace('ё', 'е')
+
+
+class IngredientIndex:
+    """Индекс названий ингредиентов в памяти процесса.
+
+    Строится при первом обращении и хранит отсортированный массив
+    нормализованных названий. Поиск по префиксу выполняется бинарным
+    поиском, затем при необходимости добавляются совпадения по подстроке:
+    для запросов от NGRAM символов кандидаты берутся из самого короткого
+    списка позиций триграмм запроса. Более короткие подстроки ищутся
+    только по префиксу, остальное - триграммный поиск в базе.
+    Индекс перестраивается, когда меняется общая версия справочника
+    ингредиентов, которую сигналы обновляют при любой записи.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None
+
+    def _build(self, version):
+        from .serializers import IngredientSerializer
+
+        items = sorted(
+            IngredientSerializer(Ingredient.objects.all(), many=True).data,
+            key=lambda item: normalize(item['name'])
+        )
+        keys = [normalize(item['name']) for item in items]
+        grams = defaultdict(lambda: array('I'))
+        for position, key in enumerate(keys):
+            for gram in {key[start:start + NGRAM]
+                         for start in range(len(key) - NGRAM + 1)}:
+                grams[gram].append(position)
+        return version, keys, items, dict(grams)
+
+    def _get_state(self):
+        version = get_version(INGREDIENTS)
+        state = self._state
+        if state is None or state[0] != version:
+            with self._lock:
+                if self._state is state:
+                    self._state = self._build(version)
+                state = self._state
+        return state
+
+    def search(self, query, limit=None):
+        """Сначала совпадения по префиксу, затем по подстроке."""
+        limit = limit or settings.INGREDIENT_SEARCH_LIMIT
+        _, keys, items, grams = self._get_state()
+        needle = normalize(query)
+        results = []
+        position = bisect_left(keys, needle)
+        while (position < len(keys) and len(results) < limit
+               and keys[position].startswith(needle)):
+            results.append(items[position])
+            position += 1
+        if len(results) < limit and len(needle) >= NGRAM:
+            postings = [
+                grams.get(needle[start:start + NGRAM], ())
+                for start in range(len(needle) - NGRAM + 1)
+            ]
+            for position in min(postings, key=len):
+                key = keys[position]
+                if needle in key and not key.startswith(needle):
+                    results.append(items[position])
+                    if len(results) == limit:
+                        break
+        return results
+
+
+ingredient_index = IngredientIndex()
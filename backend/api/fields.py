@@ -1,15 +1,40 @@
 import base64
 
+from django.conf import settings
 from django.core.files.base import ContentFile
+from PIL import Image, UnidentifiedImageError
 from rest_framework import serializers
 
 
 class Base64ImageField(serializers.ImageField):
+    default_error_messages = {
+        'too_large': 'Размер изображения не должен превышать {limit} байт.',
+        'too_many_pixels': 'Изображение не должно быть больше '
+                           '{limit} пикселей.',
+    }
+
+    def check_limits(self, file):
+        """Проверяет размер и число пикселей до декодирования картинки."""
+        if file.size > settings.MAX_IMAGE_SIZE:
+            self.fail('too_large', limit=settings.MAX_IMAGE_SIZE)
+        try:
+            width, height = Image.open(file).size
+        except (UnidentifiedImageError, OSError):
+            self.fail('invalid_image')
+        finally:
+            file.seek(0)
+        if width * height > settings.MAX_IMAGE_PIXELS:
+            self.fail('too_many_pixels', limit=settings.MAX_IMAGE_PIXELS)
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
             format, imgstr = data.split(';base64,')
             ext = format.split('/')[-1]
+            if len(imgstr) * 3 // 4 > settings.MAX_IMAGE_SIZE:
+                self.fail('too_large', limit=settings.MAX_IMAGE_SIZE)
 
             data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+        if hasattr(data, 'size') and hasattr(data, 'seek'):
+            self.check_limits(data)
 
         return super().to_internal_value(data)
@@ -1,6 +1,11 @@
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            TrigramSimilarity)
+from django.db.models import F, Q
 from django_filters.rest_framework import FilterSet, filters
+from rest_framework.exceptions import ValidationError
 
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.constants import SEARCH_CONFIG
+from recipes.models import Ingredient, Recipe, Tag, popularity
 
 
 class IngredientFilter(FilterSet):
@@ -18,17 +23,30 @@ class RecipesFilter(FilterSet):
     )
     tags = filters.ModelMultipleChoiceFilter(
         queryset=Tag.objects.all(),
-        field_name='tags__slug',
         to_field_name='slug',
+        method='get_tags',
     )
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart',
     )
+    search = filters.CharFilter(method='get_search')
+    ordering = filters.ChoiceFilter(
+        choices=(('popular', 'По популярности'),),
+        method='get_ordering'
+    )
 
     class Meta:
         model = Recipe
         fields = ['is_favorited', 'is_in_shopping_cart', 'author']
 
+    def get_tags(self, queryset, name, value):
+        """Рецепты хотя бы с одним из тегов, без соединения и DISTINCT."""
+        if value:
+            return queryset.filter(
+                tag_ids__overlap=[tag.pk for tag in value]
+            )
+        return queryset
+
     def get_is_favorited(self, queryset, name, value):
         if value:
             return queryset.filter(
@@ -42,3 +60,22 @@ class RecipesFilter(FilterSet):
                 recipe_shopping_cart__user__id=self.request.user.id
             )
         return queryset
+
+    def get_search(self, queryset, name, value):
+        """Полнотекстовый поиск с опечатками в названии, по релевантности."""
+        query = SearchQuery(value, config=SEARCH_CONFIG,
+                            search_type='websearch')
+        return queryset.filter(
+            Q(search_vector=query) | Q(name__trigram_similar=value)
+        ).annotate(
+            rank=SearchRank(F('search_vector'), query)
+            + TrigramSimilarity('name', value)
+        ).order_by('-rank', '-pub_date')
+
+    def get_ordering(self, queryset, name, value):
+        """Сначала рецепты, чаще всего добавляемые в избранное и корзины."""
+        if 'cursor' in self.request.query_params:
+            raise ValidationError({
+                'ordering': 'Курсорная пагинация доступна только '
+                            'для сортировки по дате.'})
+        return queryset.order_by(popularity().desc(), '-pub_date', '-id')
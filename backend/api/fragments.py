@@ -0,0 +1,87 @@
+import threading
+from time import monotonic
+from uuid import uuid4
+
+from django.core.cache import cache
+
+from recipes.cache import INGREDIENTS, TAGS, get_versions, version_key
+
+FRAGMENT_PREFETCH = ('recipe_ingredients__ingredient', 'tags')
+STATS_KEY = 'stats:recipe_fragments'
+STATS_FLUSH_INTERVAL = 10
+
+
+def recipe_version_key(recipe_id):
+    return version_key(f'recipe:{recipe_id}')
+
+
+def user_version_key(user_id):
+    return version_key(f'user:{user_id}')
+
+
+def get_fragment_keys(recipes, host):
+    """Ключи фрагментов с версиями рецепта, автора и справочников."""
+    catalogs = [version_key(name) for name in (TAGS, INGREDIENTS)]
+    keys = list(catalogs)
+    for recipe in recipes:
+        keys += [recipe_version_key(recipe.pk),
+                 user_version_key(recipe.author_id)]
+    versions = get_versions(list(dict.fromkeys(keys)))
+    catalog_version = ':'.join(versions[key] for key in catalogs)
+    return {
+        recipe.pk: ':'.join((
+            f'recipe:{recipe.pk}:{host}',
+            versions[recipe_version_key(recipe.pk)],
+            versions[user_version_key(recipe.author_id)],
+            catalog_version,
+        ))
+        for recipe in recipes
+    }
+
+
+def invalidate_recipes(recipe_ids):
+    cache.set_many({
+        recipe_version_key(recipe_id): uuid4().hex
+        for recipe_id in recipe_ids
+    }, None)
+
+
+def invalidate_user(user_id):
+    cache.set(user_version_key(user_id), uuid4().hex, None)
+
+
+class FragmentStats:
+    """Счётчики попаданий в кэш фрагментов и стоимости их построения.
+
+    Копятся в памяти процесса и раз в STATS_FLUSH_INTERVAL секунд
+    добавляются к общим значениям в кэше.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.hits = self.misses = 0
+        self.rebuild_seconds = 0.0
+        self.flushed_at = monotonic()
+
+    def record(self, hits, misses, rebuild_seconds):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.rebuild_seconds += rebuild_seconds
+            if monotonic() - self.flushed_at >= STATS_FLUSH_INTERVAL:
+                self.flush()
+
+    def flush(self):
+        totals = cache.get(STATS_KEY) or {
+            'hits': 0, 'misses': 0, 'rebuild_seconds': 0.0}
+        totals['hits'] += self.hits
+        totals['misses'] += self.misses
+        totals['rebuild_seconds'] += self.rebuild_seconds
+        cache.set(STATS_KEY, totals, None)
+        self._reset()
+
+
+fragment_stats = FragmentStats()
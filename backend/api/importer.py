@@ -0,0 +1,131 @@
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import as_serializer_error
+
+from recipes.feed import schedule_fan_out
+from recipes.images import schedule_variants
+from recipes.models import Ingredient, IngredientAmount, Recipe, Tag
+from .serializers import RecipeImportSerializer
+
+
+def collect_ids(values, key=None):
+    """Целочисленные идентификаторы из списка, мусор пропускается."""
+    ids = set()
+    if not isinstance(values, list):
+        return ids
+    for value in values:
+        if key is not None:
+            value = value.get(key) if isinstance(value, dict) else None
+        try:
+            ids.add(int(value))
+        except (TypeError, ValueError):
+            pass
+    return ids
+
+
+class RecipeImporter:
+    """Пакетный импорт рецептов в формате RecipeCreateSerializer.
+
+    Записи обрабатываются пачками: теги и ингредиенты всей пачки
+    загружаются двумя запросами, рецепты, связи с тегами и количества
+    ингредиентов вставляются через bulk_create в одной транзакции.
+    Ошибки отдельных записей возвращаются в результатах и не прерывают
+    импорт остальных.
+    """
+
+    def __init__(self, author, batch_size=None):
+        self.author = author
+        self.batch_size = batch_size or settings.RECIPE_IMPORT_BATCH_SIZE
+
+    def run(self, lines):
+        """Принимает пары (номер строки, JSON) и отдаёт результаты."""
+        lines = iter(lines)
+        while True:
+            batch = list(islice(lines, self.batch_size))
+            if not batch:
+                return
+            yield from self.import_batch(batch)
+
+    def parse(self, batch):
+        items, results = [], []
+        for line, text in batch:
+            try:
+                item = json.loads(text)
+            except ValueError as error:
+                results.append({'line': line, 'errors': {
+                    'non_field_errors': [f'Некорректный JSON: {error}']}})
+                continue
+            if not isinstance(item, dict):
+                results.append({'line': line, 'errors': {
+                    'non_field_errors': ['Ожидался объект JSON.']}})
+                continue
+            items.append((line, item))
+        return items, results
+
+    def validate(self, items):
+        ingredient_ids, tag_ids = set(), set()
+        for _, item in items:
+            ingredient_ids |= collect_ids(item.get('ingredients'), 'id')
+            tag_ids |= collect_ids(item.get('tags'))
+        context = {
+            'ingredients': Ingredient.objects.in_bulk(ingredient_ids),
+            'tags': Tag.objects.in_bulk(tag_ids),
+        }
+        # Поля сериализатора строятся один раз на пачку.
+        serializer = RecipeImportSerializer(context=context)
+        valid, results = [], []
+        for line, item in items:
+            try:
+                valid.append((line, serializer.run_validation(item)))
+            except ValidationError as error:
+                results.append({
+                    'line': line, 'errors': as_serializer_error(error)})
+        return valid, results
+
+    @transaction.atomic
+    def save(self, valid):
+        recipes, tags, ingredients = [], [], []
+        for _, data in valid:
+            data = dict(data)
+            tags.append(data.pop('tags'))
+            ingredients.append(data.pop('ingredients'))
+            recipes.append(Recipe(author=self.author, **data))
+        Recipe.objects.bulk_create(recipes)
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tag)
+            for recipe, recipe_tags in zip(recipes, tags)
+            for tag in recipe_tags
+        )
+        IngredientAmount.objects.bulk_create(
+            IngredientAmount(recipe=recipe, ingredient_id=ingredient['id'],
+                             amount=ingredient['amount'])
+            for recipe, recipe_ingredients in zip(recipes, ingredients)
+            for ingredient in recipe_ingredients
+        )
+        created = Recipe.objects.filter(pk__in=[r.pk for r in recipes])
+        created.update_search_vector()
+        created.update_tag_ids()
+        for recipe in recipes:
+            schedule_variants(recipe)
+        schedule_fan_out(recipe.pk for recipe in recipes)
+        return recipes
+
+    def import_batch(self, batch):
+        items, results = self.parse(batch)
+        valid, errors = self.validate(items)
+        results += errors
+        if valid:
+            try:
+                recipes = self.save(valid)
+            except DatabaseError as error:
+                results += [{'line': line, 'errors': {
+                    'non_field_errors': [f'Ошибка записи пачки: {error}']}}
+                    for line, _ in valid]
+            else:
+                results += [{'line': line, 'id': recipe.pk}
+                            for (line, _), recipe in zip(valid, recipes)]
+        return sorted(results, key=lambda result: result['line'])
@@ -0,0 +1,287 @@
+import asyncio
+import random
+import ssl
+from collections import defaultdict
+from math import ceil
+from time import monotonic, perf_counter
+from urllib.parse import urlencode, urlsplit
+
+# Доля запросов каждого вида в смеси нагрузки.
+TRAFFIC_MIX = {
+    'recipes_list': 25,
+    'recipes_filtered': 15,
+    'recipe_detail': 20,
+    'ingredient_search': 15,
+    'favorite_toggle': 10,
+    'subscriptions': 10,
+    'cart_download': 5,
+}
+PAGE_SIZE = 6
+RECIPES_LIMIT = 3
+
+
+class HTTPError(Exception):
+    pass
+
+
+class Connection:
+    """Соединение HTTP/1.1 с поддержкой keep-alive на asyncio.
+
+    Читает тело по Content-Length или chunked; если сервер закрывает
+    соединение (как синхронные воркеры gunicorn), следующий запрос
+    открывает новое.
+    """
+
+    def __init__(self, url, timeout):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.secure = parts.scheme == 'https'
+        self.port = parts.port or (443 if self.secure else 80)
+        self.host_header = parts.netloc
+        self.timeout = timeout
+        self.reader = self.writer = None
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(
+            self.host, self.port,
+            ssl=ssl.create_default_context() if self.secure else None)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def request(self, method, path, headers=None):
+        """Возвращает код ответа и тело."""
+        try:
+            return await asyncio.wait_for(
+                self._request(method, path, headers or {}), self.timeout)
+        except BaseException:
+            self.close()
+            raise
+
+    async def _request(self, method, path, headers):
+        if self.writer is None:
+            await self.open()
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host_header}',
+                 'Content-Length: 0']
+        lines += [f'{name}: {value}' for name, value in headers.items()]
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode())
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise HTTPError('Сервер закрыл соединение.')
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+        if response_headers.get('transfer-encoding') == 'chunked':
+            content = await self.read_chunked()
+        elif 'content-length' in response_headers:
+            content = await self.reader.readexactly(
+                int(response_headers['content-length']))
+        else:
+            content = await self.reader.read()
+            self.close()
+        if response_headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, content
+
+    async def read_chunked(self):
+        chunks = []
+        while True:
+            size = int((await self.reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                while (await self.reader.readline()) not in (b'\r\n', b''):
+                    pass
+                return b''.join(chunks)
+            chunks.append(await self.reader.readexactly(size))
+            await self.reader.readexactly(2)
+
+
+def percentile(values, fraction):
+    """Процентиль по методу ближайшего ранга; values отсортированы."""
+    if not values:
+        return None
+    return values[max(0, ceil(fraction * len(values)) - 1)]
+
+
+class Stats:
+    """Задержки и ошибки по видам запросов."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+
+    def record(self, name, latency, error=None):
+        if error is None:
+            self.latencies[name].append(latency)
+        else:
+            self.errors[name][error] += 1
+
+    def summary(self, duration):
+        endpoints = {}
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            latencies = sorted(self.latencies[name])
+            endpoints[name] = self.describe(
+                latencies, dict(self.errors[name]), duration)
+        everything = sorted(
+            latency for values in self.latencies.values()
+            for latency in values)
+        errors = defaultdict(int)
+        for name_errors in self.errors.values():
+            for error, count in name_errors.items():
+                errors[error] += count
+        return {'endpoints': endpoints,
+                'total': self.describe(everything, dict(errors), duration)}
+
+    def describe(self, latencies, errors, duration):
+        def ms(value):
+            return None if value is None else round(value * 1000, 2)
+
+        return {
+            'requests': len(latencies) + sum(errors.values()),
+            'errors': errors,
+            'rps': round(len(latencies) / duration, 2) if duration else 0,
+            'mean_ms': ms(sum(latencies) / len(latencies)
+                          if latencies else None),
+            'p50_ms': ms(percentile(latencies, 0.50)),
+            'p95_ms': ms(percentile(latencies, 0.95)),
+            'p99_ms': ms(percentile(latencies, 0.99)),
+            'max_ms': ms(latencies[-1] if latencies else None),
+        }
+
+
+class VirtualUser:
+    """Пользователь, выполняющий запросы из смеси TRAFFIC_MIX.
+
+    data - общие для всех идентификаторы (рецепты, авторы, теги,
+    префиксы ингредиентов), favorites - избранное этого пользователя
+    среди data['recipes'], чтобы переключение не давало ошибок 400.
+    """
+
+    def __init__(self, url, token, favorites, has_cart, data, rng,
+                 timeout):
+        self.connection = Connection(url, timeout)
+        self.headers = {'Authorization': f'Token {token}'}
+        self.favorites = set(favorites)
+        self.has_cart = has_cart
+        self.data = data
+        self.rng = rng
+
+    def recipes_list(self):
+        page = self.rng.randint(1, 10)
+        return 'GET', self.query('/api/recipes/', page=page,
+                                 limit=PAGE_SIZE)
+
+    def recipes_filtered(self):
+        params = self.rng.choice((
+            {'tags': self.rng.choice(self.data['tags'])},
+            {'author': self.rng.choice(self.data['authors'])},
+            {'is_favorited': 1},
+            {'is_in_shopping_cart': 1},
+            {'ordering': 'popular'},
+        ))
+        return 'GET', self.query('/api/recipes/', limit=PAGE_SIZE,
+                                 **params)
+
+    def recipe_detail(self):
+        recipe = self.rng.choice(self.data['recipes'])
+        return 'GET', f'/api/recipes/{recipe}/'
+
+    def ingredient_search(self):
+        return 'GET', self.query(
+            '/api/ingredients/',
+            name=self.rng.choice(self.data['ingredient_prefixes']))
+
+    def favorite_toggle(self):
+        recipe = self.rng.choice(self.data['recipes'])
+        method = 'DELETE' if recipe in self.favorites else 'POST'
+        self.favorites ^= {recipe}
+        return method, f'/api/recipes/{recipe}/favorite/'
+
+    def subscriptions(self):
+        return 'GET', self.query('/api/users/subscriptions/',
+                                 limit=PAGE_SIZE,
+                                 recipes_limit=RECIPES_LIMIT)
+
+    def cart_download(self):
+        fmt = self.rng.choice(('txt', 'csv', 'json', 'pdf'))
+        return 'GET', self.query('/api/recipes/download_shopping_cart/',
+                                 format=fmt)
+
+    def query(self, path, **params):
+        return f'{path}?{urlencode(params)}'
+
+    async def run(self, mix, stats, warmup_until, deadline):
+        if not self.has_cart:
+            mix = {name: weight for name, weight in mix.items()
+                   if name != 'cart_download'}
+        if not mix:
+            return
+        names, weights = zip(*mix.items())
+        while monotonic() < deadline:
+            name = self.rng.choices(names, weights)[0]
+            method, path = getattr(self, name)()
+            started = perf_counter()
+            error = None
+            try:
+                status, _ = await self.connection.request(
+                    method, path, self.headers)
+                if status >= 400:
+                    error = f'HTTP {status}'
+            except asyncio.TimeoutError:
+                error = 'timeout'
+            except (OSError, HTTPError, asyncio.IncompleteReadError,
+                    ValueError, IndexError) as exc:
+                error = type(exc).__name__
+            if monotonic() >= warmup_until:
+                stats.record(name, perf_counter() - started, error)
+        self.connection.close()
+
+
+async def run_load(url, users, data, mix, duration, warmup, timeout,
+                   seed):
+    """Запускает по виртуальному пользователю на каждый элемент users
+    на duration секунд после warmup секунд прогрева. users - список
+    словарей с ключами token, favorites и has_cart."""
+    rng = random.Random(seed)
+    stats = Stats()
+    started = monotonic()
+    warmup_until = started + warmup
+    deadline = warmup_until + duration
+    virtual_users = [
+        VirtualUser(url, user['token'], user['favorites'],
+                    user['has_cart'], data,
+                    random.Random(rng.getrandbits(64)), timeout)
+        for user in users
+    ]
+    await asyncio.gather(*(
+        user.run(mix, stats, warmup_until, deadline)
+        for user in virtual_users
+    ))
+    elapsed = monotonic() - max(started, warmup_until)
+    return stats.summary(elapsed)
+
+
+def compare(current, baseline, threshold):
+    """Строки сравнения с прошлым прогоном и список регрессий p95."""
+    lines, regressions = [], []
+    for name, result in current['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if not before or not before['p95_ms'] or not result['p95_ms']:
+            continue
+        change = (result['p95_ms'] - before['p95_ms']) / before['p95_ms']
+        rps_change = ((result['rps'] - before['rps']) / before['rps']
+                      if before['rps'] else 0)
+        lines.append(f'{name:<20} p95 {before["p95_ms"]:>8} -> '
+                     f'{result["p95_ms"]:>8} мс ({change:+.0%}), '
+                     f'rps {rps_change:+.0%}')
+        if change > threshold:
+            regressions.append(name)
+    return lines, regressions
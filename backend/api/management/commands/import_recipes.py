@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importer import RecipeImporter
+from api.parsers import JSONLinesParser
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Импортирует рецепты из файла JSON Lines в формате '
+            'RecipeCreateSerializer, по одному рецепту на строку.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу .jsonl')
+        parser.add_argument(
+            '--author',
+            required=True,
+            help='Email автора, от имени которого публикуются рецепты.'
+        )
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        author = User.objects.filter(email=options['author']).first()
+        if author is None:
+            raise CommandError(
+                f'Пользователь {options["author"]} не найден.')
+        importer = RecipeImporter(author, options['batch_size'])
+        created = failed = 0
+        with open(options['path'], 'rb') as file:
+            lines = JSONLinesParser().read_lines(file, 'utf-8')
+            for result in importer.run(lines):
+                if 'id' in result:
+                    created += 1
+                    continue
+                failed += 1
+                self.stderr.write(
+                    f'Строка {result["line"]}: {result["errors"]}')
+        self.stdout.write(f'Добавлено: {created}, с ошибками: {failed}.')
+        if created:
+            self.stdout.write(self.style.SUCCESS('Рецепты импортированы.'))
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import random
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from api.loadtest import TRAFFIC_MIX, compare, run_load
+from recipes.models import Ingredient, Recipe, ShoppingList, Tag, popularity
+from users.models import User
+
+RECIPE_SAMPLE = 1000
+INGREDIENT_SAMPLE = 200
+CART_SIZE = 3
+USERNAME_PREFIX = 'load_test_'
+EMAIL_DOMAIN = 'load-test.invalid'
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест запущенного бэкенда: виртуальные '
+            'пользователи с токенами выполняют смесь запросов (списки '
+            'рецептов с фильтрами, рецепт, поиск ингредиентов, избранное, '
+            'подписки, выгрузка корзины). Выводит пропускную способность '
+            'и задержки p50/p95/p99 по видам запросов. Данные для '
+            'запросов берутся из базы, к которой подключён manage.py, '
+            'поэтому она должна совпадать с базой бэкенда: это база '
+            'тестового стенда, заполненная командой seed_data. Для '
+            'прогона создаются отдельные пользователи, после него они '
+            'удаляются вместе с избранным и корзинами.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000')
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=20,
+            help='Число одновременных пользователей.'
+        )
+        parser.add_argument('--duration', type=float, default=60,
+                            help='Длительность замера, секунд.')
+        parser.add_argument('--warmup', type=float, default=5,
+                            help='Прогрев без учёта в статистике, секунд.')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument(
+            '--mix',
+            nargs='+',
+            metavar='NAME=WEIGHT',
+            help=f'Изменить веса смеси: {", ".join(TRAFFIC_MIX)}.'
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--output',
+            help='Файл для результатов JSON, вне MEDIA_ROOT.'
+        )
+        parser.add_argument(
+            '--compare',
+            help='JSON прошлого прогона: вывести разницу и завершиться '
+                 'ошибкой при росте p95 больше --threshold.'
+        )
+        parser.add_argument('--threshold', type=float, default=0.2)
+
+    def get_mix(self, options):
+        mix = dict(TRAFFIC_MIX)
+        for item in options['mix'] or ():
+            name, _, weight = item.partition('=')
+            if name not in mix:
+                raise CommandError(f'Неизвестный вид запроса: {name}')
+            try:
+                mix[name] = float(weight)
+            except ValueError:
+                raise CommandError(f'Некорректный вес: {item}')
+        mix = {name: weight for name, weight in mix.items() if weight > 0}
+        if not mix:
+            raise CommandError('Все веса смеси равны нулю.')
+        return mix
+
+    def get_data(self, rng):
+        recipes = list(Recipe.objects.order_by(
+            popularity().desc(), '-pub_date', '-id'
+        ).values_list('pk', 'author_id')[:RECIPE_SAMPLE])
+        if not recipes:
+            raise CommandError('В базе нет рецептов, заполните её '
+                               'командой seed_data.')
+        names = list(Ingredient.objects.values_list(
+            'name', flat=True)[:INGREDIENT_SAMPLE])
+        return {
+            'recipes': [pk for pk, _ in recipes],
+            'authors': sorted({author for _, author in recipes}),
+            'tags': list(Tag.objects.values_list('slug', flat=True)),
+            'ingredient_prefixes': [
+                name[:rng.randint(1, 3)] for name in names] or ['а'],
+        }
+
+    def load_test_users(self):
+        return User.objects.filter(username__startswith=USERNAME_PREFIX,
+                                   email__endswith=f'@{EMAIL_DOMAIN}')
+
+    def create_users(self, count, recipe_ids, rng):
+        """Пользователи прогона с токенами и CART_SIZE рецептами
+        в корзине; избранное у них изначально пустое."""
+        users = User.objects.bulk_create(
+            User(username=f'{USERNAME_PREFIX}{i}',
+                 email=f'{USERNAME_PREFIX}{i}@{EMAIL_DOMAIN}',
+                 first_name='Нагрузочный', last_name='Тест', password='!')
+            for i in range(count)
+        )
+        tokens = Token.objects.bulk_create(
+            Token(user=user, key=Token.generate_key()) for user in users)
+        for user in users:
+            ShoppingList.objects.add_many(user.pk, rng.sample(
+                recipe_ids, min(CART_SIZE, len(recipe_ids))))
+        return [{'token': token.key, 'favorites': [], 'has_cart': True}
+                for token in tokens]
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"запрос":<20} {"всего":>7} {"ошибок":>7} {"rps":>8} '
+            f'{"p50":>8} {"p95":>8} {"p99":>8}')
+        rows = [*results['endpoints'].items(), ('всего', results['total'])]
+        for name, result in rows:
+            self.stdout.write(
+                f'{name:<20} {result["requests"]:>7} '
+                f'{sum(result["errors"].values()):>7} {result["rps"]:>8} '
+                f'{result["p50_ms"] or "-":>8} {result["p95_ms"] or "-":>8} '
+                f'{result["p99_ms"] or "-":>8}')
+            for error, count in result['errors'].items():
+                self.stdout.write(f'    {error}: {count}')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['duration'] <= 0:
+            raise CommandError('--concurrency и --duration должны быть '
+                               'положительными.')
+        if options['output'] and Path(options['output']).resolve(
+        ).is_relative_to(Path(settings.MEDIA_ROOT).resolve()):
+            raise CommandError('Файл результатов внутри MEDIA_ROOT будет '
+                               'доступен всем, укажите другой --output.')
+        mix = self.get_mix(options)
+        rng = random.Random(options['seed'])
+        data = self.get_data(rng)
+        self.load_test_users().delete()
+        users = self.create_users(options['concurrency'], data['recipes'],
+                                  rng)
+        self.stdout.write(
+            f'{options["concurrency"]} пользователей, '
+            f'{options["duration"]:g} с после {options["warmup"]:g} с '
+            f'прогрева, {options["url"]}')
+        try:
+            results = asyncio.run(run_load(
+                options['url'], users, data, mix, options['duration'],
+                options['warmup'], options['timeout'], options['seed']))
+        finally:
+            self.load_test_users().delete()
+        results['options'] = {
+            name: options[name]
+            for name in ('url', 'concurrency', 'duration', 'warmup', 'seed')
+        }
+        results['options']['mix'] = mix
+        self.report(results)
+        if options['output']:
+            Path(options['output']).write_text(
+                json.dumps(results, ensure_ascii=False, indent=2))
+            self.stdout.write(f'Результаты записаны в {options["output"]}.')
+        if options['compare']:
+            baseline = json.loads(Path(options['compare']).read_text())
+            lines, regressions = compare(
+                results, baseline, options['threshold'])
+            for line in lines:
+                self.stdout.write(line)
+            if regressions:
+                raise CommandError(
+                    f'Рост p95 больше {options["threshold"]:.0%}: '
+                    f'{", ".join(regressions)}')
+        self.stdout.write(self.style.SUCCESS('Нагрузочный тест завершён.'))
@@ -0,0 +1,30 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from api.fragments import STATS_KEY
+
+
+class Command(BaseCommand):
+    help = 'Показывает статистику кэша фрагментов рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Обнулить накопленную статистику.'
+        )
+
+    def handle(self, *args, **options):
+        totals = cache.get(STATS_KEY) or {
+            'hits': 0, 'misses': 0, 'rebuild_seconds': 0.0}
+        requests = totals['hits'] + totals['misses']
+        hit_ratio = totals['hits'] / requests if requests else 0
+        rebuild_ms = (totals['rebuild_seconds'] * 1000 / totals['misses']
+                      if totals['misses'] else 0)
+        self.stdout.write(
+            f'Обращений: {requests}, попаданий: {totals["hits"]} '
+            f'({hit_ratio:.1%}), промахов: {totals["misses"]}\n'
+            f'Среднее время построения фрагмента: {rebuild_ms:.2f} мс'
+        )
+        if options['reset']:
+            cache.delete(STATS_KEY)
@@ -0,0 +1,290 @@
+import atexit
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from time import monotonic, perf_counter
+from uuid import uuid4
+
+from django.conf import settings
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+HISTOGRAMS = {
+    'request_duration_seconds': ('Время обработки запроса.',
+                                 SECONDS_BUCKETS),
+    'request_db_seconds': ('Время SQL-запросов за запрос.', SECONDS_BUCKETS),
+    'request_serialize_seconds': ('Время сериализации и рендеринга ответа.',
+                                  SECONDS_BUCKETS),
+    'request_queries': ('Число SQL-запросов за запрос.', QUERY_BUCKETS),
+}
+PREFIX = 'foodgram_http_'
+METRICS_FLUSH_INTERVAL = 10
+RETIRED_FILE = 'retired.json'
+LOCK_FILE = '.lock'
+
+current_timings = ContextVar('current_timings', default=None)
+
+
+class RequestTimings:
+    """Счётчики одного запроса: SQL и сериализация."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.serialize_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка connection.execute_wrapper."""
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += perf_counter() - started
+            self.queries += 1
+
+
+@contextmanager
+def measure_serialization():
+    """Учитывает время блока как сериализацию текущего запроса.
+
+    Вложенные блоки (сериализатор внутри сериализатора) не суммируются.
+    """
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    timings.serialize_depth += 1
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        timings.serialize_depth -= 1
+        if not timings.serialize_depth:
+            timings.serialize_seconds += perf_counter() - started
+
+
+def instrument_serializers():
+    """Замеряет Serializer.data и рендеринг ответов DRF.
+
+    В DRF нет точек расширения для этого, поэтому свойства оборачиваются
+    один раз при запуске приложения.
+    """
+    from rest_framework.response import Response
+    from rest_framework.serializers import ListSerializer, Serializer
+
+    def timed(prop):
+        def getter(self):
+            with measure_serialization():
+                return prop.fget(self)
+        return property(getter)
+
+    for cls, name in ((Serializer, 'data'), (ListSerializer, 'data'),
+                      (Response, 'rendered_content')):
+        setattr(cls, name, timed(getattr(cls, name)))
+
+
+def merge(target, source):
+    for key, value in source.items():
+        if isinstance(value, dict):
+            merge(target.setdefault(key, {}), value)
+        elif isinstance(value, list):
+            current = target.setdefault(key, [0] * len(value))
+            for index, item in enumerate(value):
+                current[index] += item
+        else:
+            target[key] = target.get(key, 0) + value
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+@contextmanager
+def locked(directory, operation):
+    """Блокировка каталога снимков: перенос в RETIRED_FILE идёт под
+    исключительной, чтение - под разделяемой, чтобы не учесть снимок
+    дважды."""
+    with open(directory / LOCK_FILE, 'w') as lock:
+        fcntl.flock(lock, operation)
+        yield
+
+
+def write_json(path, data):
+    """Атомарно заменяет файл: читатели не видят его недописанным."""
+    temporary = path.with_name(f'.{path.name}')
+    temporary.write_text(json.dumps(data))
+    os.replace(temporary, path)
+
+
+class MetricsRegistry:
+    """Гистограммы по маршрутам в памяти процесса.
+
+    Каждый процесс (воркер gunicorn) раз в METRICS_FLUSH_INTERVAL секунд
+    и при штатном завершении записывает свой снимок в файл
+    <pid>-<uuid>.json в METRICS_DIR; /metrics суммирует файлы всех
+    процессов. Снимки завершившихся процессов при сборе переносятся
+    в RETIRED_FILE, поэтому их счётчики сохраняются, а число файлов не
+    превышает число живых воркеров плюс один.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+        atexit.register(self.flush_current)
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.name = f'{self.pid}-{uuid4().hex[:8]}.json'
+        self.series = {}
+        self.flushed_at = monotonic()
+
+    def observe(self, route, method, status, timings, duration):
+        values = {
+            'request_duration_seconds': duration,
+            'request_db_seconds': timings.db_seconds,
+            'request_serialize_seconds': timings.serialize_seconds,
+            'request_queries': timings.queries,
+        }
+        with self._lock:
+            if os.getpid() != self.pid:
+                self._reset()
+            series = self.series.setdefault(
+                json.dumps((route, method)), {'status': {}, 'histograms': {}})
+            series['status'][str(status)] = (
+                series['status'].get(str(status), 0) + 1)
+            for name, value in values.items():
+                buckets = HISTOGRAMS[name][1]
+                histogram = series['histograms'].setdefault(
+                    name, {'buckets': [0] * len(buckets), 'sum': 0,
+                           'count': 0})
+                for index, bound in enumerate(buckets):
+                    if value <= bound:
+                        histogram['buckets'][index] += 1
+                histogram['sum'] += value
+                histogram['count'] += 1
+            if monotonic() - self.flushed_at >= METRICS_FLUSH_INTERVAL:
+                self.flush()
+
+    def flush(self):
+        directory = Path(settings.METRICS_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        write_json(directory / self.name, self.series)
+        self.flushed_at = monotonic()
+
+    def flush_current(self):
+        """Записывает снимок, если процесс уже что-то измерил."""
+        with self._lock:
+            if os.getpid() == self.pid and self.series:
+                self.flush()
+
+    def snapshots(self, directory):
+        """Снимки процессов: {путь: pid}."""
+        paths = {}
+        for path in directory.glob('*.json'):
+            pid = path.name.partition('-')[0]
+            if pid.isdigit():
+                paths[path] = int(pid)
+        return paths
+
+    def retire(self, directory):
+        """Переносит снимки завершившихся процессов в RETIRED_FILE."""
+        dead = [path for path, pid in self.snapshots(directory).items()
+                if not process_alive(pid)]
+        if not dead:
+            return
+        with locked(directory, fcntl.LOCK_EX):
+            retired_path = directory / RETIRED_FILE
+            try:
+                retired = json.loads(retired_path.read_text())
+            except (OSError, ValueError):
+                retired = {}
+            merged = []
+            for path in dead:
+                try:
+                    merge(retired, json.loads(path.read_text()))
+                except (OSError, ValueError):
+                    continue
+                merged.append(path)
+            if not merged:
+                return
+            write_json(retired_path, retired)
+            for path in merged:
+                path.unlink(missing_ok=True)
+
+    def collect(self):
+        """Сумма снимков всех процессов, включая текущий."""
+        self.flush_current()
+        directory = Path(settings.METRICS_DIR)
+        if not directory.is_dir():
+            return {}
+        self.retire(directory)
+        total = {}
+        with locked(directory, fcntl.LOCK_SH):
+            for path in (*self.snapshots(directory),
+                         directory / RETIRED_FILE):
+                try:
+                    merge(total, json.loads(path.read_text()))
+                except (OSError, ValueError):
+                    continue
+        return total
+
+    def render(self):
+        """Текстовый формат Prometheus."""
+        series = sorted(
+            (tuple(json.loads(key)), value)
+            for key, value in self.collect().items()
+        )
+        lines = [f'# HELP {PREFIX}requests_total Число запросов.',
+                 f'# TYPE {PREFIX}requests_total counter']
+        for (route, method), value in series:
+            for status, count in sorted(value['status'].items()):
+                lines.append(
+                    f'{PREFIX}requests_total'
+                    f'{labels(route=route, method=method, status=status)} '
+                    f'{count}')
+        for name, (description, buckets) in HISTOGRAMS.items():
+            metric = f'{PREFIX}{name}'
+            lines += [f'# HELP {metric} {description}',
+                      f'# TYPE {metric} histogram']
+            for (route, method), value in series:
+                histogram = value['histograms'].get(name)
+                if histogram is None:
+                    continue
+                for bound, count in zip(
+                        (*buckets, '+Inf'),
+                        (*histogram['buckets'], histogram['count'])):
+                    lines.append(
+                        f'{metric}_bucket'
+                        f'{labels(route=route, method=method, le=bound)} '
+                        f'{count}')
+                lines.append(f'{metric}_sum'
+                             f'{labels(route=route, method=method)} '
+                             f'{histogram["sum"]:.6f}')
+                lines.append(f'{metric}_count'
+                             f'{labels(route=route, method=method)} '
+                             f'{histogram["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+def labels(**values):
+    escaped = (
+        str(value).replace('\\', '\\\\').replace('"', '\\"')
+        .replace('\n', '\\n')
+        for value in values.values()
+    )
+    return '{' + ','.join(
+        f'{name}="{value}"' for name, value in zip(values, escaped)) + '}'
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,78 @@
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.db import connections
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from .metrics import RequestTimings, current_timings, metrics
+from .profiling import profile_requested, run_profiled, save_profile
+
+
+class ServerTimingMiddleware:
+    """Замеряет запрос: число и время SQL, сериализацию, общее время.
+
+    Результат отдаётся клиенту в заголовке Server-Timing и попадает в
+    гистограммы по маршрутам для /metrics. Запросы, выполненные при
+    отдаче потокового ответа, в замер не входят.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        started = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings))
+                response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        duration = perf_counter() - started
+        response['Server-Timing'] = (
+            f'db;dur={timings.db_seconds * 1000:.1f};'
+            f'desc="{timings.queries} queries", '
+            f'serialize;dur={timings.serialize_seconds * 1000:.1f}, '
+            f'total;dur={duration * 1000:.1f}'
+        )
+        match = request.resolver_match
+        metrics.observe(match.view_name if match else 'unmatched',
+                        request.method, response.status_code, timings,
+                        duration)
+        return response
+
+
+class ProfilingMiddleware:
+    """Профилирует запрос сотрудника по заголовку X-Profile или
+    параметру ?profile.
+
+    Профиль сохраняется на диск в каталог маршрута, его имя
+    возвращается в заголовке X-Profile. Остальные запросы проходят без
+    изменений; флаг от других пользователей игнорируется.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profile_requested(request) or not self.is_staff(request):
+            return self.get_response(request)
+        response, profiler = run_profiled(self.get_response, request)
+        if profiler is not None:
+            match = request.resolver_match
+            response['X-Profile'] = save_profile(
+                profiler, match.view_name if match else 'unmatched',
+                request.method, response.status_code)
+        return response
+
+    def is_staff(self, request):
+        if request.user.is_staff:
+            return True
+        try:
+            credentials = TokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        return credentials is not None and credentials[0].is_staff
@@ -1,9 +1,16 @@
+import gzip
+
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
 from django.shortcuts import get_object_or_404
 from rest_framework import (mixins, viewsets, status)
 from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
+from recipes.cache import get_version
 from recipes.models import Recipe
+from .serializers import RecipeIdsSerializer
 
 
 class CreateDestroyViewSet(mixins.CreateModelMixin,
@@ -35,8 +42,72 @@ class CreateDestroyViewSet(mixins.CreateModelMixin,
             return Response({'errors': self.print_string},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        self.name_model.objects.get(
+        self.perform_destroy(self.name_model.objects.get(
             user=request.user,
             recipe_id=recipe_id
-        ).delete()
+        ))
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class RecipeBatchMixin:
+    """Пакетное добавление (POST) и удаление (DELETE) рецептов
+    в избранное или корзину с результатом по каждому id."""
+
+    def change_batch(self, request, model):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        if request.method == 'POST':
+            found, added = model.objects.add_many(request.user.id, recipe_ids)
+            statuses = {
+                recipe_id: ('added' if recipe_id in added else 'exists')
+                for recipe_id in found
+            }
+        else:
+            removed = model.objects.remove_many(request.user.id, recipe_ids)
+            statuses = dict.fromkeys(removed, 'removed')
+        return Response({'results': [
+            {'id': recipe_id, 'status': statuses.get(recipe_id, 'not_found')}
+            for recipe_id in recipe_ids
+        ]})
+
+
+class SnapshotListMixin:
+    """Отдаёт полный список справочника из закэшированного снимка.
+
+    Снимок хранится уже отрендеренным и сжатым gzip под ключом с версией
+    справочника, версия же служит ETag. Запросы с параметрами и
+    не-JSON форматы обрабатываются обычным list().
+    """
+    snapshot_name = None
+
+    def get_snapshot(self, version):
+        key = f'snapshot:{self.snapshot_name}:{version}'
+        snapshot = cache.get(key)
+        if snapshot is None:
+            body = JSONRenderer().render(self.get_serializer(
+                self.get_queryset(), many=True).data)
+            snapshot = (body, gzip.compress(body, mtime=0))
+            cache.set(key, snapshot)
+        return snapshot
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params or request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+        version = get_version(self.snapshot_name)
+        etag = f'"{self.snapshot_name}-{version}"'
+        if_none_match = request.headers.get('If-None-Match', '')
+        if any(tag.strip().removeprefix('W/') in (etag, '*')
+               for tag in if_none_match.split(',')):
+            response = HttpResponseNotModified()
+        else:
+            body, compressed = self.get_snapshot(version)
+            if 'gzip' in request.headers.get('Accept-Encoding', ''):
+                response = HttpResponse(compressed,
+                                        content_type='application/json')
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        response['Vary'] = 'Accept-Encoding'
+        return response
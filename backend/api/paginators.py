@@ -1,6 +1,116 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from foodgram.paginators import CountingPaginator
 
 
 class LimitPaginator(PageNumberPagination):
     """Кастомная пагинация страниц."""
     page_size_query_param = 'limit'
+    count_cache_timeout = settings.PAGINATION_COUNT_CACHE_TIMEOUT
+    count_estimate_threshold = settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD
+
+    def django_paginator_class(self, object_list, per_page):
+        return CountingPaginator(
+            object_list, per_page,
+            cache_timeout=self.count_cache_timeout,
+            estimate_threshold=self.count_estimate_threshold,
+        )
+
+    def get_paginated_response(self, data):
+        paginator = self.page.paginator
+        return Response(OrderedDict([
+            ('count', paginator.count),
+            ('count_is_exact', paginator.count_is_exact),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+
+class RecipePaginator(LimitPaginator):
+    """Пагинация рецептов: по страницам или по курсору.
+
+    Если в запросе есть параметр cursor (пустой - для первой страницы),
+    выдача упорядочивается по (-pub_date, -id) и следующая страница
+    выбирается по ключу последнего рецепта, без COUNT и OFFSET.
+    """
+    cursor_query_param = 'cursor'
+    cursor_fields = ('pub_date', 'id')
+    invalid_cursor_message = 'Некорректный курсор.'
+
+    def is_cursor_mode(self, request):
+        return self.cursor_query_param in request.query_params
+
+    def encode_cursor(self, item):
+        pub_date, pk = (getattr(item, field) for field in self.cursor_fields)
+        position = f'{pub_date.isoformat()}|{pk}'
+        return urlsafe_b64encode(position.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            pub_date, pk = urlsafe_b64decode(
+                cursor.encode()).decode().split('|')
+            pub_date, pk = parse_datetime(pub_date), int(pk)
+        except (BinasciiError, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.is_cursor_mode(request)
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(
+            request.query_params.get(self.cursor_query_param, ''))
+        date_field, pk_field = self.cursor_fields
+        queryset = queryset.order_by(f'-{date_field}', f'-{pk_field}')
+        if position:
+            pub_date, pk = position
+            queryset = queryset.filter(
+                Q(**{f'{date_field}__lte': pub_date})
+                & ~Q(**{date_field: pub_date, f'{pk_field}__gte': pk})
+            )
+        results = list(queryset[:page_size + 1])
+        self.page = results[:page_size]
+        self.has_next = len(results) > page_size
+        return self.page
+
+    def get_next_cursor_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_cursor_link(),
+            'results': data,
+        })
+
+
+class FeedPaginator(RecipePaginator):
+    """Лента подписок всегда листается курсором по записям ленты."""
+    cursor_fields = ('pub_date', 'recipe_id')
+
+    def is_cursor_mode(self, request):
+        return True
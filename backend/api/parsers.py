@@ -0,0 +1,24 @@
+from django.conf import settings
+from rest_framework.parsers import BaseParser
+
+
+class JSONLinesParser(BaseParser):
+    """Поток JSON Lines: одна запись на строку.
+
+    Тело запроса не читается целиком: возвращается генератор пар
+    (номер строки, текст), пустые строки пропускаются.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        return self.read_lines(stream, encoding)
+
+    def read_lines(self, stream, encoding):
+        if stream is None:
+            return
+        for number, line in enumerate(stream, 1):
+            line = line.decode(encoding).strip()
+            if line:
+                yield number, line
@@ -0,0 +1,87 @@
+"""Постраничная выгрузка PDF на reportlab.
+
+Строки раскладываются по страницам по мере чтения курсора. reportlab
+собирает документ целиком, поэтому он пишется во временный файл (в памяти,
+пока не превысит SPOOL_SIZE, дальше на диске) и отдаётся частями.
+Из TrueType-шрифта встраивается подмножество использованных глифов,
+поэтому кириллица и другие символы Unicode выводятся без перекодировки.
+"""
+from functools import lru_cache
+from tempfile import SpooledTemporaryFile
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase.pdfmetrics import registerFont, stringWidth
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen.canvas import Canvas
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+MARGIN = 50
+FONT_SIZE = 12
+LEADING = 16
+LINES_PER_PAGE = int(PAGE_HEIGHT - 2 * MARGIN) // LEADING
+LINE_WIDTH = PAGE_WIDTH - 2 * MARGIN
+WRAP_INDENT = '    '
+SPOOL_SIZE = 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+
+@lru_cache(maxsize=None)
+def register_font(path):
+    """Регистрирует TrueType-шрифт и возвращает его имя в reportlab.
+
+    Если файла нет или это не TrueType, бросает TTFError.
+    """
+    registerFont(TTFont(path, path))
+    return path
+
+
+def wrap(line, font):
+    """Разбивает строку по словам на части не шире страницы.
+
+    Продолжения пишутся с отступом, слово длиннее строки
+    разрезается по символам.
+    """
+    def width(text):
+        return stringWidth(text, font, FONT_SIZE)
+
+    part, empty = '', True
+    for word in line.split(' '):
+        if not empty:
+            if width(f'{part} {word}') > LINE_WIDTH:
+                yield part
+                part = WRAP_INDENT
+            else:
+                part += ' '
+        for char in word:
+            if not empty and width(part + char) > LINE_WIDTH:
+                yield part
+                part = WRAP_INDENT
+            part += char
+            empty = False
+    yield part
+
+
+def stream_pdf(lines, font_path):
+    """Раскладывает строки по страницам A4 и отдаёт документ частями."""
+    font = register_font(font_path)
+    with SpooledTemporaryFile(SPOOL_SIZE) as output:
+        canvas = Canvas(output, pagesize=A4, pageCompression=1)
+        text, count = None, 0
+        for line in lines:
+            for part in wrap(line, font):
+                if count == LINES_PER_PAGE:
+                    canvas.drawText(text)
+                    canvas.showPage()
+                    text, count = None, 0
+                if text is None:
+                    text = canvas.beginText(
+                        MARGIN, PAGE_HEIGHT - MARGIN - FONT_SIZE)
+                    text.setFont(font, FONT_SIZE, LEADING)
+                text.textLine(part)
+                count += 1
+        if text is not None:
+            canvas.drawText(text)
+        canvas.showPage()
+        canvas.save()
+        output.seek(0)
+        yield from iter(lambda: output.read(CHUNK_SIZE), b'')
@@ -0,0 +1,103 @@
+import cProfile
+import io
+import pstats
+import re
+from datetime import datetime
+from pathlib import Path
+from uuid import uuid4
+
+from django.conf import settings
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAM = 'profile'
+PROFILE_SUFFIX = '.prof'
+STATS_LIMIT = 40
+# Ключи pstats.SortKey вместе с псевдонимами (tottime, ncalls).
+SORT_KEYS = frozenset(pstats.Stats.sort_arg_dict_default)
+
+
+def profile_requested(request):
+    return (PROFILE_HEADER in request.META
+            or PROFILE_PARAM in request.GET)
+
+
+def route_directory(route):
+    """Каталог профилей маршрута; имя маршрута приводится к имени файла."""
+    return Path(settings.PROFILE_DIR) / re.sub(r'[^\w.-]', '.', route)
+
+
+def run_profiled(get_response, request):
+    """Выполняет запрос под cProfile.
+
+    Возвращает ответ и профиль или None, если в потоке уже работает
+    другой профилировщик.
+    """
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return get_response(request), None
+    try:
+        response = get_response(request)
+    finally:
+        profiler.disable()
+    return response, profiler
+
+
+def save_profile(profiler, route, method, status):
+    """Записывает профиль в каталог маршрута, оставляя PROFILE_KEEP
+    последних."""
+    directory = route_directory(route)
+    directory.mkdir(parents=True, exist_ok=True)
+    name = (f'{datetime.now():%Y%m%d-%H%M%S}-{method}-{status}-'
+            f'{uuid4().hex[:8]}{PROFILE_SUFFIX}')
+    profiler.dump_stats(directory / name)
+    for stale in sorted(directory.glob(f'*{PROFILE_SUFFIX}'),
+                        reverse=True)[settings.PROFILE_KEEP:]:
+        stale.unlink(missing_ok=True)
+    return f'{directory.name}/{name}'
+
+
+def list_profiles():
+    """Сохранённые профили, новые первыми."""
+    root = Path(settings.PROFILE_DIR)
+    profiles = []
+    for path in root.glob(f'*/*{PROFILE_SUFFIX}'):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        profiles.append({
+            'route': path.parent.name,
+            'name': f'{path.parent.name}/{path.name}',
+            'size': stat.st_size,
+            'created': datetime.fromtimestamp(stat.st_mtime),
+        })
+    return sorted(profiles, key=lambda profile: profile['created'],
+                  reverse=True)
+
+
+def get_profile_path(name):
+    """Путь к профилю по имени из list_profiles или None."""
+    route, _, filename = name.partition('/')
+    if (route in ('', '.', '..') or not filename.endswith(PROFILE_SUFFIX)
+            or '/' in filename):
+        return None
+    path = route_directory(route) / filename
+    if route_directory(route).name != route or not path.is_file():
+        return None
+    if not path.resolve().is_relative_to(
+            Path(settings.PROFILE_DIR).resolve()):
+        return None
+    return path
+
+
+def format_profile(path, sort='cumulative'):
+    """Текстовая сводка профиля: STATS_LIMIT самых дорогих функций.
+
+    sort - один из SORT_KEYS.
+    """
+    output = io.StringIO()
+    stats = pstats.Stats(str(path), stream=output)
+    stats.strip_dirs().sort_stats(sort).print_stats(STATS_LIMIT)
+    return output.getvalue()
@@ -0,0 +1,114 @@
+import csv
+import json
+from abc import ABCMeta, abstractmethod
+
+from django.conf import settings
+from rest_framework.renderers import BaseRenderer
+
+try:
+    from reportlab.pdfbase.ttfonts import TTFError
+
+    from . import pdf
+except ImportError:
+    pdf = None
+
+CART_TITLE = 'Список покупок:'
+CART_HEADERS = ('Ингредиент', 'Единица измерения', 'Количество')
+
+
+class RendererUnavailable(Exception):
+    """Формат выгрузки нельзя отдать на этом сервере."""
+
+
+class Echo:
+    """Буфер для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingCartRenderer(BaseRenderer, metaclass=ABCMeta):
+    """Базовый класс форматов выгрузки списка покупок.
+
+    stream() принимает итератор строк (название, единица, количество)
+    и отдаёт файл частями, render() нужен для ответов с ошибками.
+    check() вызывается до начала ответа: после первой части заголовки
+    уже отправлены, и сообщить клиенту об ошибке нельзя.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, str):
+            data = json.dumps(data, ensure_ascii=False)
+        return data.encode('utf-8')
+
+    def check(self):
+        """Бросает RendererUnavailable, если формат выгрузить нельзя."""
+
+    @abstractmethod
+    def stream(self, rows):
+        """Генератор частей файла."""
+
+    def get_content_type(self):
+        if self.charset:
+            return f'{self.media_type}; charset={self.charset}'
+        return self.media_type
+
+
+class TextCartRenderer(ShoppingCartRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, rows):
+        yield f'{CART_TITLE}\n\n'
+        for name, unit, amount in rows:
+            yield f'{name} ({unit}) — {amount}\n'
+
+
+class CSVCartRenderer(ShoppingCartRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(CART_HEADERS)
+        for row in rows:
+            yield writer.writerow(row)
+
+
+class JSONCartRenderer(ShoppingCartRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, rows):
+        separator = '['
+        for name, unit, amount in rows:
+            yield separator + json.dumps({
+                'name': name,
+                'measurement_unit': unit,
+                'amount': amount,
+            }, ensure_ascii=False)
+            separator = ','
+        yield '[]' if separator == '[' else ']'
+
+
+class PDFCartRenderer(ShoppingCartRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+    def check(self):
+        if pdf is None:
+            raise RendererUnavailable('Не установлен reportlab.')
+        try:
+            pdf.register_font(settings.SHOPPING_CART_PDF_FONT)
+        except TTFError as error:
+            raise RendererUnavailable(
+                f'Не удалось загрузить шрифт '
+                f'{settings.SHOPPING_CART_PDF_FONT}: {error}') from error
+
+    def stream(self, rows):
+        lines = (f'{name} ({unit}) — {amount}' for name, unit, amount in rows)
+        yield from pdf.stream_pdf(
+            (line for head in ((CART_TITLE, ''), lines) for line in head),
+            settings.SHOPPING_CART_PDF_FONT)
@@ -1,13 +1,21 @@
+from time import perf_counter
 
+from django.conf import settings
+from django.core.cache import cache
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from djoser.serializers import (UserCreateSerializer, UserSerializer)
 from rest_framework import serializers
 
 from recipes.constants import (MAX_COOKING_TIME, MIN_VALUE)
+from recipes.images import schedule_variants
 from recipes.models import (Tag, Recipe, IngredientAmount, Ingredient,
-                            FavoritedRecipe, ShoppingList)
+                            FavoritedRecipe, ShoppingCartIngredient,
+                            ShoppingList)
 from users.models import (User, Subscribe)
 from .fields import Base64ImageField
+from .fragments import FRAGMENT_PREFETCH, fragment_stats, get_fragment_keys
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -24,6 +32,22 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class UserPageSerializer(serializers.ListSerializer):
+    """Список пользователей: подписки читателя одним запросом."""
+
+    def to_representation(self, data):
+        users = list(data)
+        request = self.context.get('request')
+        pending = [obj for obj in users if not hasattr(obj, 'is_subscribed')]
+        if pending and request and request.user.is_authenticated:
+            subscribed = set(Subscribe.objects.filter(
+                user=request.user, author__in=pending
+            ).values_list('author_id', flat=True))
+            for obj in pending:
+                obj.is_subscribed = obj.pk in subscribed
+        return super().to_representation(users)
+
+
 class UserListSerializer(UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
@@ -35,8 +59,11 @@ class UserListSerializer(UserSerializer):
                   'first_name',
                   'last_name',
                   'is_subscribed')
+        list_serializer_class = UserPageSerializer
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         return (self.context.get('request').user.is_authenticated
                 and Subscribe.objects.filter(
                     user=self.context.get('request').user,
@@ -87,10 +114,28 @@ class SubscribeRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'image', 'cooking_time')
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=MIN_VALUE),
+        allow_empty=False,
+        max_length=settings.RECIPE_BATCH_LIMIT,
+        error_messages={
+            'max_length': 'Не больше {max_length} рецептов за один запрос.'}
+    )
+
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
+
+
+class RecipesLimitSerializer(serializers.Serializer):
+    """Валидация параметра recipes_limit из строки запроса."""
+    recipes_limit = serializers.IntegerField(min_value=MIN_VALUE,
+                                             required=False)
+
+
 class SubscribeListSerializer(UserListSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.ReadOnlyField(
-        source='recipes.count')
+    recipes_count = serializers.SerializerMethodField()
 
     class Meta(UserListSerializer.Meta):
         fields = UserListSerializer.Meta.fields + (
@@ -102,19 +147,23 @@ class SubscribeListSerializer(UserListSerializer):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return
-        limit = request.query_params.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if limit:
-            try:
-                recipes = recipes[:int(limit)]
-            except TypeError:
-                raise serializers.ValidationError({
-                    'errors': 'Ошибка несоответствия типов!'
-                })
+        if hasattr(obj, 'limited_recipes'):
+            recipes = obj.limited_recipes
+        else:
+            limit_serializer = RecipesLimitSerializer(
+                data=request.query_params)
+            limit_serializer.is_valid(raise_exception=True)
+            limit = limit_serializer.validated_data.get('recipes_limit')
+            recipes = obj.recipes.all()[:limit]
         return SubscribeRecipeSerializer(
             recipes, many=True, context=self.context
         ).data
 
+    def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
+        return obj.recipes.count()
+
 
 class IngredientAmountSerializer(serializers.ModelSerializer):
     id = serializers.CharField(source='ingredient.id')
@@ -128,7 +177,21 @@ class IngredientAmountSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
+class RecipeListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        return self.child.represent_many(list(data))
+
+
 class RecipeSerializer(serializers.ModelSerializer):
+    """Рецепт с кэшированием не зависящей от пользователя части.
+
+    Фрагмент (теги, автор, ингредиенты, текст, изображения) хранится в
+    кэше под ключом с версиями рецепта, автора и справочников; флаги
+    is_favorited, is_in_shopping_cart и is_subscribed подставляются
+    при каждом ответе.
+    """
+
     tags = TagSerializer(many=True)
     author = UserListSerializer()
     ingredients = IngredientAmountSerializer(
@@ -137,14 +200,75 @@ class RecipeSerializer(serializers.ModelSerializer):
     )
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients', 'is_favorited', 'name',
-            'image', 'text', 'cooking_time', 'is_in_shopping_cart')
+            'image', 'image_srcset', 'text', 'cooking_time',
+            'is_in_shopping_cart')
+        list_serializer_class = RecipeListSerializer
+
+    def to_representation(self, instance):
+        return self.represent_many([instance])[0]
+
+    def build_fragments(self, recipes, keys):
+        started = perf_counter()
+        prefetch_related_objects(recipes, *FRAGMENT_PREFETCH)
+        fragments = {}
+        for recipe in recipes:
+            fragments[keys[recipe.pk]] = super().to_representation(recipe)
+        cache.set_many(fragments, settings.RECIPE_FRAGMENT_TIMEOUT)
+        return fragments, perf_counter() - started
+
+    def represent_many(self, recipes):
+        request = self.context.get('request')
+        keys = get_fragment_keys(
+            recipes, request.get_host() if request else '')
+        fragments = cache.get_many(keys.values())
+        missing = [recipe for recipe in recipes
+                   if keys[recipe.pk] not in fragments]
+        rebuild_seconds = 0.0
+        if missing:
+            built, rebuild_seconds = self.build_fragments(missing, keys)
+            fragments.update(built)
+        fragment_stats.record(
+            len(recipes) - len(missing), len(missing), rebuild_seconds)
+        return [
+            self.add_viewer_fields(dict(fragments[keys[recipe.pk]]), recipe)
+            for recipe in recipes
+        ]
+
+    def add_viewer_fields(self, data, recipe):
+        data['is_favorited'] = self.get_is_favorited(recipe)
+        data['is_in_shopping_cart'] = self.get_is_in_shopping_cart(recipe)
+        data['author'] = dict(data['author'])
+        data['author']['is_subscribed'] = (
+            self.fields['author'].get_is_subscribed(recipe.author))
+        return data
+
+    def get_image_srcset(self, obj):
+        """srcset по форматам; пока копий нет - только оригинал."""
+        if not obj.image:
+            return {}
+        request = self.context.get('request')
+        url = (request.build_absolute_uri if request
+               else (lambda location: location))
+        if not obj.image_variants:
+            return {'original': url(obj.image.url)}
+        storage = obj.image.storage
+        return {
+            extension: ', '.join(
+                f'{url(storage.url(name))} {width}w'
+                for width, name in names.items()
+            )
+            for extension, names in obj.image_variants.items()
+        }
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         return (self.context.get('request').user.is_authenticated
                 and FavoritedRecipe.objects.filter(
                     user=self.context.get('request').user,
@@ -152,6 +276,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         ).exists())
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         return (self.context.get('request').user.is_authenticated
                 and ShoppingList.objects.filter(
                     user=self.context.get('request').user,
@@ -222,8 +348,10 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
 
     def validate(self, data):
         ingredients = data.get('ingredients')
+        existing = self.get_existing_ingredients(
+            [ingredient['id'] for ingredient in ingredients])
         for ingredient in ingredients:
-            if not Ingredient.objects.filter(id=ingredient['id']).exists():
+            if ingredient['id'] not in existing:
                 raise serializers.ValidationError({
                     'ingredients': f'Ингредиента с id - {ingredient["id"]} нет'
                 })
@@ -236,6 +364,9 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                 'tags': 'Тэги не должны повторяться!'})
         return data
 
+    def get_existing_ingredients(self, ids):
+        return Ingredient.objects.in_bulk(ids)
+
     def create_ingredients(self, instance, ingredients):
         create_ingredients = [
             IngredientAmount(
@@ -249,27 +380,94 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             create_ingredients
         )
 
+    def update_ingredients(self, instance, ingredients):
+        """Меняет только отличающиеся строки и возвращает разницу
+        количеств {ingredient_id: изменение} для списков покупок."""
+        current = {
+            amount.ingredient_id: amount
+            for amount in instance.recipe_ingredients.all()
+        }
+        amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        changes = {}
+        created, updated = [], []
+        for ingredient_id, amount in amounts.items():
+            row = current.get(ingredient_id)
+            if row is None:
+                created.append(IngredientAmount(
+                    recipe=instance, ingredient_id=ingredient_id,
+                    amount=amount))
+                changes[ingredient_id] = amount
+            elif row.amount != amount:
+                changes[ingredient_id] = amount - row.amount
+                row.amount = amount
+                updated.append(row)
+        removed = [
+            ingredient_id for ingredient_id in current
+            if ingredient_id not in amounts
+        ]
+        for ingredient_id in removed:
+            changes[ingredient_id] = -current[ingredient_id].amount
+        if created:
+            IngredientAmount.objects.bulk_create(created)
+        if updated:
+            IngredientAmount.objects.bulk_update(updated, ('amount',))
+        if removed:
+            instance.recipe_ingredients.filter(
+                ingredient_id__in=removed).delete()
+        return changes
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         instance = super().create(validated_data)
         self.create_ingredients(instance, ingredients)
+        Recipe.objects.filter(pk=instance.pk).update_search_vector()
+        schedule_variants(instance)
         return instance
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         if 'ingredients' in validated_data:
-            ingredients = validated_data.pop('ingredients')
-            instance.ingredients.clear()
-            self.create_ingredients(instance, ingredients)
+            changes = self.update_ingredients(
+                instance, validated_data.pop('ingredients'))
+            ShoppingCartIngredient.objects.apply_amounts(
+                instance.id, changes)
         if 'tags' in validated_data:
             instance.tags.set(
                 validated_data.pop('tags'))
-        return super().update(
-            instance, validated_data)
+        new_image = 'image' in validated_data
+        instance = super().update(instance, validated_data)
+        Recipe.objects.filter(pk=instance.pk).update_search_vector()
+        if new_image:
+            schedule_variants(instance)
+        return instance
 
     def to_representation(self, instance):
         return RecipeSerializer(instance, context=self.context).data
 
 
+class RecipeImportSerializer(RecipeCreateSerializer):
+    """Проверка рецепта при импорте по справочникам, заранее
+    загруженным для всей пачки и переданным в контексте."""
+    tags = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False)
+
+    def validate_tags(self, value):
+        tags = self.context['tags']
+        for pk in value:
+            if pk not in tags:
+                raise serializers.ValidationError(
+                    f'Недопустимый первичный ключ "{pk}" - '
+                    'объект не существует.')
+        return [tags[pk] for pk in value]
+
+    def get_existing_ingredients(self, ids):
+        return self.context['ingredients']
+
+
 class ShoppingListSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField(
         source='recipe.id',
@@ -0,0 +1,111 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from recipes.cache import INGREDIENTS, TAGS, bump_version
+from recipes.feed import schedule_fan_out
+from recipes.models import (FavoritedRecipe, FeedEntry, Ingredient, Recipe,
+                            ShoppingCartIngredient, ShoppingList, Tag)
+from users.models import Subscribe, User
+from .fragments import invalidate_recipes, invalidate_user
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def bump_ingredients_version(sender, **kwargs):
+    transaction.on_commit(partial(bump_version, INGREDIENTS))
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def bump_tags_version(sender, **kwargs):
+    transaction.on_commit(partial(bump_version, TAGS))
+
+
+@receiver(post_save, sender=Ingredient)
+def update_recipes_search_vector(sender, instance, created, **kwargs):
+    if not created:
+        Recipe.objects.filter(
+            recipe_ingredients__ingredient=instance
+        ).update_search_vector()
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def invalidate_recipe_fragment(sender, instance, **kwargs):
+    transaction.on_commit(partial(invalidate_recipes, (instance.pk,)))
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_new_recipe(sender, instance, created, **kwargs):
+    if created:
+        schedule_fan_out((instance.pk,))
+
+
+@receiver(post_save, sender=Subscribe)
+def backfill_feed(sender, instance, created, **kwargs):
+    if created:
+        FeedEntry.objects.backfill(
+            instance.user_id, instance.author_id,
+            settings.FEED_BACKFILL_LIMIT)
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_fragments(sender, instance, update_fields, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login', 'password'}:
+        return
+    transaction.on_commit(partial(invalidate_user, instance.pk))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def update_recipe_tag_ids(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            instance.tag_ids = list(sender.objects.filter(
+                recipe=instance
+            ).order_by('tag_id').values_list('tag_id', flat=True))
+            Recipe.objects.filter(pk=instance.pk).update(
+                tag_ids=instance.tag_ids)
+        return
+    if action == 'pre_clear':
+        instance._cleared_recipe_ids = list(
+            instance.recipe_set.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        Recipe.objects.filter(pk__in=pk_set).update_tag_ids()
+    elif action == 'post_clear':
+        Recipe.objects.filter(
+            pk__in=instance._cleared_recipe_ids).update_tag_ids()
+
+
+@receiver(post_delete, sender=Tag)
+def remove_deleted_tag_ids(sender, instance, **kwargs):
+    Recipe.objects.filter(tag_ids__contains=[instance.pk]).update_tag_ids()
+
+
+@receiver(post_save, sender=FavoritedRecipe)
+@receiver(post_save, sender=ShoppingList)
+def increment_recipe_counter(sender, instance, created, **kwargs):
+    if created:
+        sender.objects.update_counters((instance.recipe_id,), 1)
+
+
+@receiver(post_save, sender=ShoppingList)
+def add_recipe_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        ShoppingCartIngredient.objects.apply_recipe(
+            instance.recipe_id, 1, instance.user_id)
+
+
+@receiver(pre_delete, sender=User)
+def release_user_recipes(sender, instance, **kwargs):
+    """Избранное, корзина и рецепты пользователя удаляются каскадом без
+    сигналов, поэтому счётчики рецептов и списки покупок других
+    пользователей с его рецептами обновляются заранее, по запросу
+    на таблицу."""
+    FavoritedRecipe.objects.filter(user=instance).decrement_counters()
+    ShoppingList.objects.filter(user=instance).decrement_counters()
+    ShoppingCartIngredient.objects.apply_carts(
+        ShoppingList.objects.filter(recipe__author=instance).exclude(
+            user=instance), -1)
@@ -0,0 +1,311 @@
+import random
+import traceback
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import (FavoritedRecipe, FeedEntry, Ingredient,
+                            IngredientAmount, Recipe, ShoppingCartIngredient,
+                            ShoppingList, Tag)
+from users.models import Subscribe, User
+
+PROJECT_ROOT = Path(settings.BASE_DIR).resolve()
+LIBRARY_SKIP_PATHS = ('/django/db/', '/django/utils/', '/psycopg2/')
+# Код проекта, через который проходит любой запрос: место вызова
+# ищется дальше по стеку.
+PROJECT_SKIP_PATHS = ('api/middleware.py',)
+SEED = 1
+# Размеры страниц и пакетов: число запросов не должно от них зависеть.
+SIZES = (1, 10)
+
+# (название, метод, адрес, клиент, тело запроса, зависит ли от размера)
+# Адрес - шаблон для str.format, тело - функция от (теста, размера).
+# Зависящие от размера запросы выполняются для каждого из SIZES: списки
+# получают параметр limit, пакетные запросы - столько же объектов.
+CASES = (
+    ('recipes_list', 'get', '/api/recipes/', 'anon', None, True),
+    ('recipes_list_auth', 'get', '/api/recipes/', 'viewer', None, True),
+    ('recipes_cursor', 'get', '/api/recipes/?cursor=', 'viewer', None,
+     True),
+    ('recipes_by_tags', 'get', '/api/recipes/?tags={tag}', 'viewer', None,
+     True),
+    ('recipes_by_author', 'get', '/api/recipes/?author={author}', 'viewer',
+     None, True),
+    ('recipes_favorited', 'get', '/api/recipes/?is_favorited=1', 'viewer',
+     None, True),
+    ('recipes_in_cart', 'get', '/api/recipes/?is_in_shopping_cart=1',
+     'viewer', None, True),
+    ('recipes_popular', 'get', '/api/recipes/?ordering=popular', 'viewer',
+     None, True),
+    ('recipes_search', 'get', '/api/recipes/?search=Рецепт', 'viewer', None,
+     True),
+    ('recipe_detail', 'get', '/api/recipes/{recipe}/', 'viewer', None,
+     False),
+    ('recipe_create', 'post', '/api/recipes/', 'viewer',
+     lambda test, size: test.recipe_payload(size), True),
+    ('recipe_update', 'patch', '/api/recipes/{own_recipe}/', 'viewer',
+     lambda test, size: test.recipe_payload(size, update=True), True),
+    ('recipe_delete', 'delete', '/api/recipes/{own_recipe}/', 'viewer',
+     None, False),
+    ('feed', 'get', '/api/recipes/feed/', 'viewer', None, True),
+    ('favorite_add', 'post', '/api/recipes/{recipe}/favorite/', 'viewer',
+     None, False),
+    ('favorite_remove', 'delete', '/api/recipes/{favorite}/favorite/',
+     'viewer', None, False),
+    ('favorite_batch', 'post', '/api/recipes/favorite/', 'viewer',
+     lambda test, size: {'recipes': test.recipe_ids[:size]}, True),
+    ('cart_add', 'post', '/api/recipes/{recipe}/shopping_cart/', 'viewer',
+     None, False),
+    ('cart_remove', 'delete', '/api/recipes/{in_cart}/shopping_cart/',
+     'viewer', None, False),
+    ('cart_batch', 'post', '/api/recipes/shopping_cart/', 'viewer',
+     lambda test, size: {'recipes': test.recipe_ids[:size]}, True),
+    ('cart_download', 'get', '/api/recipes/download_shopping_cart/',
+     'viewer', None, False),
+    ('subscriptions', 'get', '/api/users/subscriptions/?recipes_limit=3',
+     'viewer', None, True),
+    ('subscribe', 'post', '/api/users/{author}/subscribe/', 'viewer', None,
+     False),
+    ('unsubscribe', 'delete', '/api/users/{following}/subscribe/', 'viewer',
+     None, False),
+    ('users_list', 'get', '/api/users/', 'viewer', None, False),
+    ('user_detail', 'get', '/api/users/{following}/', 'viewer', None, False),
+    ('users_me', 'get', '/api/users/me/', 'viewer', None, False),
+    ('tags', 'get', '/api/tags/', 'anon', None, False),
+    ('ingredients', 'get', '/api/ingredients/?name=ing', 'anon', None,
+     False),
+)
+
+# Точное число запросов к базе при холодном кэше.
+QUERY_COUNTS = {
+    'recipes_list': 6,
+    'recipes_list_auth': 8,
+    'recipes_cursor': 6,
+    'recipes_by_tags': 8,
+    'recipes_by_author': 8,
+    'recipes_favorited': 7,
+    'recipes_in_cart': 7,
+    'recipes_popular': 8,
+    'recipes_search': 7,
+    'recipe_detail': 6,
+    'recipe_create': 23,
+    'recipe_update': 27,
+    'recipe_delete': 11,
+    'feed': 7,
+    'favorite_add': 5,
+    'favorite_remove': 5,
+    'favorite_batch': 5,
+    'cart_add': 6,
+    'cart_remove': 7,
+    'cart_batch': 8,
+    'cart_download': 3,
+    'subscriptions': 4,
+    'subscribe': 10,
+    'unsubscribe': 6,
+    'users_list': 4,
+    'user_detail': 3,
+    'users_me': 2,
+    'tags': 1,
+    'ingredients': 1,
+}
+
+
+class QueryRecorder:
+    """Обёртка выполнения SQL, запоминающая запрос и место вызова.
+
+    Местом вызова считается ближайший к запросу кадр стека из кода
+    проекта, кроме PROJECT_SKIP_PATHS, а если запрос сделан библиотекой
+    (например, аутентификация DRF) - ближайший кадр вне ORM. Кадры этого
+    модуля и выше не учитываются.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((self.call_site(), ' '.join(sql.split())))
+        return execute(sql, params, many, context)
+
+    def call_site(self):
+        library = None
+        for frame in reversed(traceback.extract_stack()[:-2]):
+            if frame.filename == __file__:
+                break
+            path = Path(frame.filename).resolve()
+            if ('site-packages' not in path.parts
+                    and path.is_relative_to(PROJECT_ROOT)):
+                if path.relative_to(PROJECT_ROOT).as_posix() in (
+                        PROJECT_SKIP_PATHS):
+                    continue
+                return (f'{path.relative_to(PROJECT_ROOT)}:{frame.lineno} '
+                        f'в {frame.name}')
+            if (library is None and 'site-packages' in path.parts
+                    and not any(part in path.as_posix()
+                                for part in LIBRARY_SKIP_PATHS)):
+                library = (f'{path.as_posix().rpartition("site-packages/")[2]}'
+                           f':{frame.lineno} в {frame.name}')
+        return library or 'неизвестно'
+
+    def by_call_site(self):
+        """Запросы, сгруппированные по месту вызова, частые первыми."""
+        sites = defaultdict(Counter)
+        for site, sql in self.queries:
+            sites[site][sql] += 1
+        lines = []
+        for site, queries in sorted(sites.items(),
+                                    key=lambda item: -sum(item[1].values())):
+            lines.append(f'{sum(queries.values()):>3} x {site}')
+            lines += [f'      {repeats:>3} x {sql}'
+                      for sql, repeats in queries.items()]
+        return '\n'.join(lines)
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'query-counts',
+}})
+class QueryCountTests(TestCase):
+    """Число запросов к базе для основных адресов API.
+
+    Каждый запрос выполняется с пустым кэшем, его изменения
+    откатываются.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(SEED)
+        size = max(SIZES)
+        viewer = User.objects.create_user(
+            username='count_viewer', email='count_viewer@example.com',
+            first_name='Проверка', last_name='Запросов', password='!')
+        cls.token = Token.objects.create(user=viewer).key
+        authors = User.objects.bulk_create(
+            User(username=f'count_author_{i}',
+                 email=f'count_author_{i}@example.com',
+                 first_name='Автор', last_name='Проверки', password='!')
+            for i in range(size + 2)
+        )
+        tags = Tag.objects.bulk_create(
+            Tag(name=f'Проверка {i}', color=f'#{0xA5A5A5 + i:06X}',
+                slug=f'count-{i}')
+            for i in range(3)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'ing проверка {i}', measurement_unit='г')
+            for i in range(size + 5)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(author=author, name=f'Рецепт {i}', text='Проверка',
+                   cooking_time=rng.randint(5, 60),
+                   image='recipes/images/count.jpg')
+            for i, author in enumerate(
+                [viewer] * 2 + [*authors, *authors, *authors])
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tag)
+            for recipe in recipes
+            for tag in (rng.sample(tags, rng.randint(1, 3))
+                        if recipe != recipes[0] else tags[:1])
+        )
+        IngredientAmount.objects.bulk_create(
+            IngredientAmount(recipe=recipe, ingredient=ingredient,
+                             amount=rng.randint(1, 500))
+            for recipe in recipes
+            for ingredient in rng.sample(ingredients, 5)
+        )
+        others = recipes[2:]
+        FavoritedRecipe.objects.bulk_create(
+            FavoritedRecipe(user=viewer, recipe=recipe)
+            for recipe in others[-size - 1:]
+        )
+        ShoppingList.objects.bulk_create(
+            ShoppingList(user=viewer, recipe=recipe)
+            for recipe in others[-size - 1:]
+        )
+        Subscribe.objects.bulk_create(
+            Subscribe(user=viewer, author=author) for author in authors[1:]
+        )
+        Recipe.objects.update_search_vector()
+        Recipe.objects.update_tag_ids()
+        Recipe.objects.reconcile_counters()
+        ShoppingCartIngredient.objects.rebuild()
+        FeedEntry.objects.rebuild(settings.FEED_BACKFILL_LIMIT)
+
+        cls.recipe_ids = [recipe.pk for recipe in others[:size]]
+        cls.tag_ids = [tag.pk for tag in tags]
+        own_ingredients = set(IngredientAmount.objects.filter(
+            recipe=recipes[0]).values_list('ingredient_id', flat=True))
+        cls.kept_ingredient = min(own_ingredients)
+        cls.new_ingredients = [ingredient.pk for ingredient in ingredients
+                               if ingredient.pk not in own_ingredients]
+        cls.urls = {
+            'tag': tags[0].slug,
+            'author': authors[0].pk,
+            'recipe': others[0].pk,
+            'own_recipe': recipes[0].pk,
+            'favorite': others[-1].pk,
+            'in_cart': others[-1].pk,
+            'following': authors[1].pk,
+        }
+
+    def setUp(self):
+        viewer = APIClient()
+        viewer.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.clients = {'anon': APIClient(), 'viewer': viewer}
+
+    def recipe_payload(self, size, update=False):
+        """Рецепт из size новых ингредиентов.
+
+        При изменении рецепта одна строка из прежних остаётся с новым
+        количеством, остальные удаляются, а теги заменяются, поэтому
+        при любом size выполняются одни и те же операции.
+        """
+        ingredients = self.new_ingredients[:size]
+        if update:
+            ingredients = [self.kept_ingredient, *ingredients]
+        return {
+            'name': 'Проверка запросов',
+            'text': 'Проверка',
+            'cooking_time': 10,
+            'tags': self.tag_ids[1:],
+            'ingredients': [
+                {'id': ingredient, 'amount': 10 + size}
+                for ingredient in ingredients
+            ],
+        }
+
+    def assertQueryCount(self, expected, recorder):
+        """Как assertNumQueries, но SQL в сообщении сгруппирован по
+        местам вызова."""
+        self.assertEqual(
+            len(recorder.queries), expected,
+            f'{len(recorder.queries)} запросов вместо {expected}:\n'
+            f'{recorder.by_call_site()}')
+
+    def test_query_counts(self):
+        for name, method, url, client, payload, sized in CASES:
+            for size in SIZES if sized else (None,):
+                path = url.format(**self.urls)
+                if sized and method == 'get':
+                    separator = '&' if '?' in path else '?'
+                    path = f'{path}{separator}limit={size}'
+                body = payload(self, size) if payload else None
+                with self.subTest(name, size=size), transaction.atomic():
+                    cache.clear()
+                    recorder = QueryRecorder()
+                    try:
+                        with connection.execute_wrapper(recorder):
+                            response = getattr(self.clients[client], method)(
+                                path, body, format='json')
+                            if response.streaming:
+                                b''.join(response.streaming_content)
+                        self.assertQueryCount(QUERY_COUNTS[name], recorder)
+                        self.assertLess(response.status_code, 400)
+                    finally:
+                        transaction.set_rollback(True)
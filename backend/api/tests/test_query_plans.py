@@ -0,0 +1,217 @@
+import random
+from unittest import skipUnless
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.views import RecipeViewSet, SubscribeViewSet
+from recipes.models import (FavoritedRecipe, FeedEntry, Ingredient,
+                            IngredientAmount, Recipe, ShoppingCartIngredient,
+                            ShoppingList, Tag)
+from users.models import Subscribe, User
+
+SEED = 1
+USERS = 10000
+RECIPES = 20000
+INGREDIENTS = 2000
+TAGS = 12
+PAGE_SIZE = 6
+RECIPES_LIMIT = 3
+# Последовательное чтение таблиц меньше этого размера не считается ошибкой.
+MIN_ROWS = 5000
+# Стоимость случайного чтения страницы, как на SSD сервера.
+RANDOM_PAGE_COST = 1.1
+WORDS = ('борщ', 'суп', 'салат', 'пирог', 'каша', 'омлет', 'плов', 'блины',
+         'котлеты', 'рагу', 'запеканка', 'паста', 'курица', 'рыба', 'грибы',
+         'овощи', 'сырники', 'щи', 'пельмени', 'торт')
+
+# Предельная стоимость плана (Total Cost) для объёма данных выше.
+QUERY_BUDGETS = {
+    'recipes_list': 60,
+    'recipes_by_tags': 80,
+    'recipes_by_author': 30,
+    'recipes_favorited': 750,
+    'recipes_in_cart': 200,
+    'recipes_popular': 60,
+    'recipes_search': 3000,
+    'recipe_ingredients': 90,
+    'subscriptions': 650,
+    'subscription_recipes': 750,
+    'feed': 30,
+    'shopping_cart': 300,
+}
+
+
+def plan_nodes(node):
+    yield node
+    for child in node.get('Plans', ()):
+        yield from plan_nodes(child)
+
+
+def analyze():
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def seed():
+    """Воспроизводимые данные объёмом, при котором видны планы запросов.
+
+    Возвращает пользователя, от имени которого выполняются запросы, автора
+    для фильтра и теги.
+    """
+    rng = random.Random(SEED)
+    users = User.objects.bulk_create(
+        User(username=f'plan_user_{i}', email=f'plan_user_{i}@example.com',
+             first_name='План', last_name='Проверка', password='!')
+        for i in range(USERS)
+    )
+    tags = Tag.objects.bulk_create(
+        Tag(name=f'План {i}', color=f'#{0x5A5A5A + i:06X}', slug=f'plan-{i}')
+        for i in range(TAGS)
+    )
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(name=f'{rng.choice(WORDS)} {i}', measurement_unit='г')
+        for i in range(INGREDIENTS)
+    )
+    recipes = Recipe.objects.bulk_create((
+        Recipe(author=rng.choice(users),
+               name=' '.join(rng.sample(WORDS, 2)),
+               text=' '.join(rng.choices(WORDS, k=30)),
+               cooking_time=rng.randint(5, 180),
+               image='recipes/images/plan.jpg')
+        for _ in range(RECIPES)
+    ), batch_size=5000)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {Recipe._meta.db_table} '
+            "SET pub_date = now() - id * interval '1 minute'"
+        )
+    Recipe.tags.through.objects.bulk_create((
+        Recipe.tags.through(recipe=recipe, tag=tag)
+        for recipe in recipes
+        for tag in rng.sample(tags, rng.randint(1, 3))
+    ), batch_size=5000)
+    IngredientAmount.objects.bulk_create((
+        IngredientAmount(recipe=recipe, ingredient=ingredient,
+                         amount=rng.randint(1, 500))
+        for recipe in recipes
+        for ingredient in rng.sample(ingredients, 5)
+    ), batch_size=5000)
+    analyze()
+    Recipe.objects.update_search_vector()
+    Recipe.objects.update_tag_ids()
+
+    viewer, others = users[0], users[1:]
+    favorites = {(viewer, recipe) for recipe in rng.sample(recipes, 200)}
+    carts = {(viewer, recipe) for recipe in rng.sample(recipes, 20)}
+    subscriptions = {(viewer, author) for author in rng.sample(others, 100)}
+    for user in others:
+        favorites.update((user, recipe) for recipe in rng.sample(recipes, 5))
+        carts.update((user, recipe) for recipe in rng.sample(recipes, 2))
+        subscriptions.update((user, author)
+                             for author in rng.sample(users, 3)
+                             if author != user)
+    FavoritedRecipe.objects.bulk_create((
+        FavoritedRecipe(user=user, recipe=recipe)
+        for user, recipe in favorites
+    ), batch_size=5000)
+    ShoppingList.objects.bulk_create((
+        ShoppingList(user=user, recipe=recipe) for user, recipe in carts
+    ), batch_size=5000)
+    Subscribe.objects.bulk_create((
+        Subscribe(user=user, author=author)
+        for user, author in subscriptions
+    ), batch_size=5000)
+    ShoppingCartIngredient.objects.rebuild()
+    Recipe.objects.reconcile_counters()
+    FeedEntry.objects.rebuild(settings.FEED_BACKFILL_LIMIT)
+    analyze()
+    return viewer, users[1], tags
+
+
+@skipUnless(connection.vendor == 'postgresql',
+            'Планы запросов проверяются только на PostgreSQL.')
+class QueryPlanTests(TestCase):
+    """Основные запросы API используют индексы и укладываются в бюджет
+    стоимости плана."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL random_page_cost = %s',
+                           (RANDOM_PAGE_COST,))
+        viewer, author, tags = seed()
+        cls.viewer_id = viewer.pk
+        cls.author_id = author.pk
+        cls.tag_slugs = [tag.slug for tag in tags[:2]]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT relname, reltuples FROM pg_class WHERE relkind = 'r'")
+            cls.table_sizes = dict(cursor.fetchall())
+
+    def get_view(self, viewset, user, params=None):
+        request = APIRequestFactory().get('/', params or {})
+        force_authenticate(request, user=user)
+        view = viewset()
+        view.action_map = {'get': 'list'}
+        view.args, view.kwargs, view.format_kwarg = (), {}, None
+        view.request = view.initialize_request(request)
+        return view
+
+    def get_queries(self):
+        viewer = User.objects.get(pk=self.viewer_id)
+
+        def recipes(params=None):
+            view = self.get_view(RecipeViewSet, viewer, params)
+            return view.filter_queryset(view.get_queryset())[:PAGE_SIZE]
+
+        subscriptions = self.get_view(
+            SubscribeViewSet, viewer, {'recipes_limit': RECIPES_LIMIT})
+        authors = list(subscriptions.get_queryset().values_list(
+            'pk', flat=True)[:PAGE_SIZE])
+        page = list(Recipe.objects.values_list('pk', flat=True)[:PAGE_SIZE])
+        return {
+            'recipes_list': recipes(),
+            'recipes_by_tags': recipes({'tags': self.tag_slugs}),
+            'recipes_by_author': recipes({'author': self.author_id}),
+            'recipes_favorited': recipes({'is_favorited': 1}),
+            'recipes_in_cart': recipes({'is_in_shopping_cart': 1}),
+            'recipes_popular': recipes({'ordering': 'popular'}),
+            'recipes_search': recipes({'search': f'{WORDS[0]} {WORDS[1]}'}),
+            'recipe_ingredients': IngredientAmount.objects.filter(
+                recipe__in=page).select_related('ingredient'),
+            'subscriptions': subscriptions.get_queryset()[:PAGE_SIZE],
+            'subscription_recipes': subscriptions.get_recipes_queryset(
+            ).filter(author__in=authors),
+            'feed': FeedEntry.objects.filter(user=viewer).order_by(
+                '-pub_date', '-recipe_id')[:PAGE_SIZE + 1],
+            'shopping_cart': viewer.shopping_cart_ingredients.values_list(
+                'ingredient__name', 'ingredient__measurement_unit', 'amount'
+            ).order_by('ingredient__name'),
+        }
+
+    def get_problems(self, name, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0][0]['Plan']
+        problems = [
+            f'последовательное чтение {node["Relation Name"]} '
+            f'(~{int(self.table_sizes.get(node["Relation Name"], 0))} строк)'
+            for node in plan_nodes(plan)
+            if node['Node Type'] == 'Seq Scan'
+            and self.table_sizes.get(node['Relation Name'], 0) >= MIN_ROWS
+        ]
+        if plan['Total Cost'] > QUERY_BUDGETS[name]:
+            problems.append(f'стоимость {plan["Total Cost"]:.0f} больше '
+                            f'бюджета {QUERY_BUDGETS[name]}')
+        return problems
+
+    def test_query_plans(self):
+        for name, queryset in self.get_queries().items():
+            with self.subTest(name):
+                problems = self.get_problems(name, queryset)
+                self.assertFalse(problems, '\n'.join(
+                    [*problems, queryset.explain()]))
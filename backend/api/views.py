@@ -1,45 +1,83 @@
-from django.db.models import Sum
-from django.shortcuts import (get_object_or_404, HttpResponse)
+import logging
+
+from django.db.models import (BooleanField, Count, Exists, F, OuterRef,
+                              Prefetch, Value, Window)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+from django.contrib import admin
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseBadRequest, StreamingHttpResponse)
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.generics import ListAPIView
-from rest_framework.permissions import (IsAuthenticated,
+from rest_framework.permissions import (IsAdminUser, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
+from recipes.cache import INGREDIENTS, TAGS
 from recipes.models import (Tag, Recipe, Ingredient, ShoppingList,
-                            FavoritedRecipe)
+                            FavoritedRecipe, FeedEntry)
 from users.models import (User, Subscribe)
+from .autocomplete import ingredient_index
 from .filters import IngredientFilter, RecipesFilter
-from .mixins import CreateDestroyViewSet
-from .paginators import LimitPaginator
+from .importer import RecipeImporter
+from .metrics import metrics
+from .mixins import (CreateDestroyViewSet, RecipeBatchMixin,
+                     SnapshotListMixin)
+from .paginators import FeedPaginator, LimitPaginator, RecipePaginator
+from .parsers import JSONLinesParser
+from .profiling import (SORT_KEYS, format_profile, get_profile_path,
+                        list_profiles)
 from .permissions import IsAuthorOrReadOnly
+from .renderers import (CSVCartRenderer, JSONCartRenderer, PDFCartRenderer,
+                        RendererUnavailable, TextCartRenderer)
 from .serializers import (FavoritedRecipeSerializer, IngredientSerializer,
                           RecipeCreateSerializer, RecipeSerializer,
-                          ShoppingListSerializer, SubscribeListSerializer,
-                          SubscribeSerializer, TagSerializer)
+                          RecipesLimitSerializer, ShoppingListSerializer,
+                          SubscribeListSerializer, SubscribeSerializer,
+                          TagSerializer)
+
+logger = logging.getLogger(__name__)
 
 
-class TagViewSet(ModelViewSet):
+class TagViewSet(SnapshotListMixin, ModelViewSet):
     permission_classes = (IsAuthenticatedOrReadOnly,)
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    snapshot_name = TAGS
+
+    def perform_authentication(self, request):
+        """Пользователь определяется лениво, при проверке прав на запись."""
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(RecipeBatchMixin, ModelViewSet):
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly)
     serializer_class = RecipeSerializer
     filterset_class = RecipesFilter
-    pagination_class = LimitPaginator
+    pagination_class = RecipePaginator
 
     def get_queryset(self):
-        return Recipe.objects.prefetch_related(
-            'recipe_ingredients__ingredient', 'tags'
-        ).all()
+        queryset = Recipe.objects.all()
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.select_related('author')
+        return queryset.annotate(
+            is_favorited=Exists(FavoritedRecipe.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingList.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+        ).prefetch_related(Prefetch(
+            'author',
+            queryset=User.objects.annotate(is_subscribed=Exists(
+                Subscribe.objects.filter(user=user, author=OuterRef('pk'))
+            ))
+        ))
 
     def get_serializer_class(self):
         if self.action in ('create', 'update', 'partial_update'):
@@ -54,35 +92,93 @@ class RecipeViewSet(ModelViewSet):
         methods=('get',),
         url_path='download_shopping_cart',
         pagination_class=None,
-        permission_classes=(IsAuthenticated,)
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(TextCartRenderer, CSVCartRenderer,
+                          JSONCartRenderer, PDFCartRenderer)
     )
     def download_file(self, request):
+        """Выгрузка списка покупок в формате из параметра ?format=."""
         user = request.user
         if not user.shopping_cart.exists():
             return Response(
                 'В корзине нет товаров', status=status.HTTP_400_BAD_REQUEST)
 
-        text = 'Список покупок:\n\n'
-        ingredient_name = 'recipe__recipe_ingredients__ingredient__name'
-        ingredient_unit = (
-            'recipe__recipe_ingredients__ingredient__measurement_unit'
+        cart = user.shopping_cart_ingredients.values_list(
+            'ingredient__name', 'ingredient__measurement_unit', 'amount'
+        ).order_by('ingredient__name')
+        renderer = request.accepted_renderer
+        try:
+            renderer.check()
+        except RendererUnavailable as error:
+            logger.error('Выгрузка %s недоступна: %s', renderer.format, error)
+            return Response(
+                f'Выгрузка в формате {renderer.format} временно недоступна',
+                status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response = StreamingHttpResponse(
+            renderer.stream(cart.iterator()),
+            content_type=renderer.get_content_type()
         )
-        recipe_amount = 'recipe__recipe_ingredients__amount'
-        amount_sum = 'recipe__recipe_ingredients__amount__sum'
-
-        cart = user.shopping_cart.select_related('recipe').values(
-            ingredient_name, ingredient_unit).annotate(Sum(
-                recipe_amount)).order_by(ingredient_name)
-        for selected in cart:
-            text += (
-                f'{selected[ingredient_name]} ({selected[ingredient_unit]})'
-                f' — {selected[amount_sum]}\n'
-            )
-        response = HttpResponse(text, content_type='text/plain')
-        filename = 'shopping_cart.txt'
+        filename = f'shopping_cart.{renderer.format}'
         response['Content-Disposition'] = f'attachment; filename={filename}'
         return response
 
+    @action(
+        detail=False,
+        methods=('get',),
+        pagination_class=FeedPaginator,
+        permission_classes=(IsAuthenticated,)
+    )
+    def feed(self, request):
+        """Рецепты авторов из подписок, от новых к старым."""
+        entries = self.paginate_queryset(FeedEntry.objects.filter(
+            user=request.user).only('pub_date', 'recipe_id'))
+        recipes = self.get_queryset().in_bulk(
+            [entry.recipe_id for entry in entries])
+        serializer = self.get_serializer(
+            [recipes[entry.recipe_id] for entry in entries
+             if entry.recipe_id in recipes],
+            many=True
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=('post', 'delete'),
+        url_path='shopping_cart',
+        permission_classes=(IsAuthenticated,)
+    )
+    def shopping_cart_batch(self, request):
+        """Добавление и удаление нескольких рецептов в корзине."""
+        return self.change_batch(request, ShoppingList)
+
+    @action(
+        detail=False,
+        methods=('post', 'delete'),
+        url_path='favorite',
+        permission_classes=(IsAuthenticated,)
+    )
+    def favorite_batch(self, request):
+        """Добавление и удаление нескольких рецептов в избранном."""
+        return self.change_batch(request, FavoritedRecipe)
+
+    @action(
+        detail=False,
+        methods=('post',),
+        url_path='import',
+        parser_classes=(JSONLinesParser,),
+        permission_classes=(IsAdminUser,)
+    )
+    def import_recipes(self, request):
+        """Пакетная публикация рецептов из потока JSON Lines."""
+        results = list(RecipeImporter(request.user).run(request.data))
+        created = sum('id' in result for result in results)
+        return Response(
+            {'created': created, 'failed': len(results) - created,
+             'results': results},
+            status=(status.HTTP_201_CREATED if created
+                    else status.HTTP_400_BAD_REQUEST)
+        )
+
 
 class FavoritedRecipeViewSet(CreateDestroyViewSet):
     """Добавление и удаление избранных реецептов"""
@@ -91,12 +187,22 @@ class FavoritedRecipeViewSet(CreateDestroyViewSet):
     print_string = 'Рецепт не в избранном'
 
 
-class IngredientViewSet(ModelViewSet):
+class IngredientViewSet(SnapshotListMixin, ModelViewSet):
     permission_classes = (IsAuthenticatedOrReadOnly,)
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
     filterset_class = IngredientFilter
+    snapshot_name = INGREDIENTS
+
+    def perform_authentication(self, request):
+        """Пользователь определяется лениво, при проверке прав на запись."""
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name:
+            return Response(ingredient_index.search(name))
+        return super().list(request, *args, **kwargs)
 
 
 class ShoppingListViewSet(CreateDestroyViewSet):
@@ -135,5 +241,82 @@ class SubscribeViewSet(ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = SubscribeListSerializer
 
+    def get_recipes_limit(self):
+        serializer = RecipesLimitSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data.get('recipes_limit')
+
+    def get_recipes_queryset(self):
+        """Первые recipes_limit рецептов каждого автора одним запросом."""
+        user = self.request.user
+        recipes = Recipe.objects.all()
+        limit = self.get_recipes_limit()
+        if limit is None:
+            return recipes
+        ranked = Recipe.objects.filter(
+            author__signed__user=user
+        ).annotate(row_number=Window(
+            expression=RowNumber(),
+            partition_by=F('author'),
+            order_by=(F('pub_date').desc(), F('id').desc()),
+        )).order_by().values('id', 'row_number')
+        sql, params = ranked.query.sql_with_params()
+        return recipes.filter(pk__in=RawSQL(
+            f'SELECT ranked.id FROM ({sql}) ranked '
+            'WHERE ranked.row_number <= %s',
+            (*params, limit)
+        ))
+
     def get_queryset(self):
-        return User.objects.filter(signed__user=self.request.user)
+        return User.objects.filter(
+            signed__user=self.request.user
+        ).annotate(
+            recipes_count=Count('recipes'),
+            is_subscribed=Value(True, output_field=BooleanField()),
+        ).order_by('username').prefetch_related(Prefetch(
+            'recipes',
+            queryset=self.get_recipes_queryset(),
+            to_attr='limited_recipes'
+        ))
+
+
+def metrics_view(request):
+    """Метрики всех воркеров в формате Prometheus.
+
+    nginx проксирует только /api/ и /admin/, поэтому адрес доступен
+    лишь внутри сети контейнеров.
+    """
+    return HttpResponse(metrics.render(),
+                        content_type='text/plain; version=0.0.4; '
+                                     'charset=utf-8')
+
+
+def profiles_view(request):
+    """Список сохранённых профилей и сводка выбранного."""
+    name = request.GET.get('name')
+    summary = None
+    if name:
+        path = get_profile_path(name)
+        if path is None:
+            raise Http404('Профиль не найден.')
+        sort = request.GET.get('sort', 'cumulative')
+        if sort not in SORT_KEYS:
+            return HttpResponseBadRequest(
+                'Неизвестная сортировка. Допустимые: '
+                f'{", ".join(sorted(SORT_KEYS))}.')
+        summary = format_profile(path, sort)
+    return TemplateResponse(request, 'admin/profiles.html', {
+        **admin.site.each_context(request),
+        'title': 'Профили запросов',
+        'profiles': list_profiles(),
+        'selected': name,
+        'summary': summary,
+    })
+
+
+def profile_download_view(request):
+    path = get_profile_path(request.GET.get('name', ''))
+    if path is None:
+        raise Http404('Профиль не найден.')
+    return FileResponse(path.open('rb'), as_attachment=True,
+                        filename=f'{path.parent.name}-{path.name}')
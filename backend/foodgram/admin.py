@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.contrib import admin
+
+from .paginators import CountingPaginator
+
+
+class EstimatedCountAdmin(admin.ModelAdmin):
+    """Список объектов без точного подсчёта строк больших таблиц.
+
+    Без фильтров количество берётся из оценки планировщика, с фильтрами
+    кэшируется, как в пагинации API.
+    """
+    show_full_result_count = False
+
+    def get_paginator(self, request, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True):
+        return CountingPaginator(
+            queryset, per_page,
+            cache_timeout=settings.PAGINATION_COUNT_CACHE_TIMEOUT,
+            estimate_threshold=settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD,
+            orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page,
+        )
@@ -0,0 +1,58 @@
+from hashlib import md5
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class CountingPaginator(Paginator):
+    """Paginator с кэшированием и оценкой общего количества объектов.
+
+    Точное количество кэшируется на cache_timeout секунд по ключу из
+    SQL-запроса, поэтому одинаковые фильтры разделяют одно значение.
+    Для запросов без условий WHERE берётся оценка планировщика
+    (pg_class.reltuples), если она не меньше estimate_threshold.
+    count_is_exact истинно, только если количество подсчитано в этом
+    запросе: значение из кэша может отставать на cache_timeout секунд.
+    """
+
+    def __init__(self, object_list, per_page, cache_timeout=None,
+                 estimate_threshold=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.cache_timeout = cache_timeout
+        self.estimate_threshold = estimate_threshold
+        self.count_is_exact = True
+
+    def estimate_count(self):
+        query = self.object_list.query
+        if query.where or query.distinct:
+            return None
+        with connections[self.object_list.db].cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                (query.get_meta().db_table,)
+            )
+            row = cursor.fetchone()
+        return row[0] if row and row[0] >= 0 else None
+
+    @cached_property
+    def count(self):
+        if self.estimate_threshold is not None:
+            estimate = self.estimate_count()
+            if estimate is not None and estimate >= self.estimate_threshold:
+                self.count_is_exact = False
+                return estimate
+        if not self.cache_timeout:
+            return self.object_list.count()
+        sql, params = self.object_list.values(
+            'pk').order_by().query.sql_with_params()
+        key = 'count:' + md5(f'{sql}{params!r}'.encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, self.cache_timeout)
+        else:
+            self.count_is_exact = False
+        return count
@@ -21,6 +21,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'colorfield',
     'rest_framework',
     'django_filters',
@@ -32,11 +33,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -74,6 +77,20 @@ DATABASES = {
 }
 
 
+# В docker compose кэш общий для воркеров: Redis с политикой
+# volatile-lru вытесняет только ключи со сроком жизни, а версии
+# справочников, рецептов и авторов хранятся без срока и не вытесняются.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+    }
+}
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -132,6 +149,46 @@ REST_FRAMEWORK = {
 AUTH_USER_MODEL = 'users.User'
 
 
+PAGINATION_COUNT_CACHE_TIMEOUT = int(
+    os.getenv('PAGINATION_COUNT_CACHE_TIMEOUT', 30))
+
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = int(
+    os.getenv('PAGINATION_COUNT_ESTIMATE_THRESHOLD', 100_000))
+
+RECIPE_FRAGMENT_TIMEOUT = int(os.getenv('RECIPE_FRAGMENT_TIMEOUT', 3600))
+
+FEED_BACKFILL_LIMIT = int(os.getenv('FEED_BACKFILL_LIMIT', 200))
+
+FEED_FANOUT_SYNC_LIMIT = int(os.getenv('FEED_FANOUT_SYNC_LIMIT', 1000))
+
+FEED_FANOUT_BATCH_SIZE = int(os.getenv('FEED_FANOUT_BATCH_SIZE', 5000))
+
+RECIPE_BATCH_LIMIT = int(os.getenv('RECIPE_BATCH_LIMIT', 100))
+
+RECIPE_IMPORT_BATCH_SIZE = int(os.getenv('RECIPE_IMPORT_BATCH_SIZE', 500))
+
+INGREDIENT_SEARCH_LIMIT = int(os.getenv('INGREDIENT_SEARCH_LIMIT', 50))
+
+MAX_IMAGE_SIZE = int(os.getenv('MAX_IMAGE_SIZE', 5 * 1024 * 1024))
+
+MAX_IMAGE_PIXELS = int(os.getenv('MAX_IMAGE_PIXELS', 24_000_000))
+
+IMAGE_VARIANT_WIDTHS = (200, 600)
+
+IMAGE_PROCESS_WORKERS = int(os.getenv('IMAGE_PROCESS_WORKERS', 2))
+
+METRICS_DIR = os.getenv('METRICS_DIR', '/tmp/foodgram_metrics')
+
+PROFILE_DIR = os.getenv('PROFILE_DIR', '/tmp/foodgram_profiles')
+
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', 20))
+
+SHOPPING_CART_PDF_FONT = os.getenv(
+    'SHOPPING_CART_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+
 DJOSER = {
     'SERIALIZERS': {
         'user': 'api.serializers.UserListSerializer',
@@ -3,9 +3,17 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from api.views import metrics_view, profile_download_view, profiles_view
+
 urlpatterns = [
+    path('admin/profiles/', admin.site.admin_view(profiles_view),
+         name='profiles'),
+    path('admin/profiles/download/',
+         admin.site.admin_view(profile_download_view),
+         name='profile-download'),
     path('admin/', admin.site.urls),
-    path('api/', include('api.urls'), name='api')
+    path('api/', include('api.urls'), name='api'),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG:
@@ -1,41 +1,47 @@
 from django.contrib import admin
 
+from foodgram.admin import EstimatedCountAdmin
+from .images import schedule_variants
 from .models import (FavoritedRecipe, Ingredient, IngredientAmount,
-                     Recipe, ShoppingList, Tag)
+                     Recipe, ShoppingCartIngredient, ShoppingList, Tag)
 
 
 class RecipeIngredientInline(admin.TabularInline):
     model = IngredientAmount
     extra = 1
+    autocomplete_fields = ('ingredient', )
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('ingredient')
 
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'color', 'slug')
+    search_fields = ('name', 'slug')
     readonly_fields = ('id', )
     fields = ('id', 'name', 'color', 'slug')
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(EstimatedCountAdmin):
     list_display = ('id', 'name', 'measurement_unit')
+    search_fields = ('name', )
     readonly_fields = ('id', )
     fields = ('id', 'name', 'measurement_unit')
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(EstimatedCountAdmin):
 
     @admin.display(description="Теги")
     def get_tags(self, obj):
-        return ", ".join(
-            [str(p) for p in obj.tags.values_list('name', flat=True)]
-        )
+        return ", ".join([tag.name for tag in obj.tags.all()])
 
     @admin.display(description="Ингредиенты")
     def get_ingredients(self, obj):
         return ", ".join(
-            [str(p) for p in obj.ingredients.values_list('name', flat=True)]
+            [ingredient.name for ingredient in obj.ingredients.all()]
         )
 
     list_display = (
@@ -43,20 +49,44 @@ class RecipeAdmin(admin.ModelAdmin):
         'pub_date'
     )
     readonly_fields = ('id', )
-    list_filter = ('name', 'author', 'tags', 'pub_date')
+    list_select_related = ('author', )
+    list_filter = ('tags', 'pub_date')
+    search_fields = ('name', 'author__username')
+    autocomplete_fields = ('author', 'tags')
     fields = ('id', 'name', 'author', 'tags', 'text', 'cooking_time', 'image')
     inlines = (RecipeIngredientInline, )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            'tags', 'ingredients')
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        Recipe.objects.filter(pk=form.instance.pk).update_search_vector()
+        if change and any(formset.has_changed() for formset in formsets):
+            ShoppingCartIngredient.objects.rebuild(
+                users=form.instance.recipe_shopping_cart.values('user'))
+        if 'image' in form.changed_data:
+            schedule_variants(form.instance)
+
+
+class UserRecipeAdmin(EstimatedCountAdmin):
+    list_display = ('id', 'user', 'recipe')
+    list_select_related = ('user', 'recipe__author')
+    search_fields = ('recipe__name', 'user__username')
+    raw_id_fields = ('user', 'recipe')
+
+    def get_readonly_fields(self, request, obj=None):
+        """Связь только создаётся и удаляется: счётчики рецептов и списки
+        покупок обновляются при этих операциях, а не при изменении."""
+        return ('user', 'recipe') if obj else ()
+
 
 @admin.register(FavoritedRecipe)
-class FavoritedRecipeAdmin(admin.ModelAdmin):
-    list_display = (
-        'id', 'user', 'recipe'
-    )
-    search_fields = ('recipe',)
-    list_filter = ('id', 'user', 'recipe')
+class FavoritedRecipeAdmin(UserRecipeAdmin):
+    pass
 
 
 @admin.register(ShoppingList)
-class ShoppingListAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'recipe')
+class ShoppingListAdmin(UserRecipeAdmin):
+    pass
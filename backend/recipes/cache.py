@@ -0,0 +1,44 @@
+from uuid import uuid4
+
+from django.core.cache import cache
+
+TAGS = 'tags'
+INGREDIENTS = 'ingredients'
+
+
+def version_key(name):
+    return f'version:{name}'
+
+
+def get_versions(keys):
+    """Версии по ключам, общие для всех процессов.
+
+    Отсутствующая версия создаётся случайной через cache.add, поэтому
+    после потери ключа она не совпадёт ни с одной прежней и закэшированные
+    по ней данные не будут отданы.
+    """
+    versions = cache.get_many(keys)
+    taken = []
+    for key in keys:
+        if key not in versions:
+            version = uuid4().hex
+            if cache.add(key, version, None):
+                versions[key] = version
+            else:
+                taken.append(key)
+    if taken:
+        versions.update(cache.get_many(taken))
+    for key in taken:
+        versions.setdefault(key, uuid4().hex)
+    return versions
+
+
+def get_version(name):
+    """Текущая версия справочника."""
+    key = version_key(name)
+    return get_versions([key])[key]
+
+
+def bump_version(name):
+    """Вызывается при любом изменении справочника."""
+    cache.set(version_key(name), uuid4().hex, None)
@@ -3,3 +3,4 @@ MAX_COOKING_TIME = 300
 MIN_VALUE = 1
 USER_CREDENTIALS_MAX_LENGTH = 150
 USER_EMAIL_LENGTH = 254
+SEARCH_CONFIG = 'russian'
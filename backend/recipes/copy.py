@@ -0,0 +1,44 @@
+import csv
+import io
+
+CHUNK_SIZE = 64 * 1024
+
+
+class CSVStream(io.RawIOBase):
+    """Файлоподобный объект, отдающий строки в формате CSV для COPY."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.buffer = b''
+        self.output = io.StringIO()
+        self.writer = csv.writer(self.output)
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while len(self.buffer) < len(target):
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.writer.writerow(row)
+            self.buffer += self.output.getvalue().encode()
+            self.output.seek(0)
+            self.output.truncate()
+        size = min(len(target), len(self.buffer))
+        target[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+
+
+def copy_rows(cursor, table, columns, rows):
+    """Загружает строки из итератора в таблицу одним COPY.
+
+    Возвращает число загруженных строк.
+    """
+    cursor.copy_expert(
+        f'COPY {table} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)',
+        CSVStream(iter(rows)),
+        size=CHUNK_SIZE
+    )
+    return cursor.rowcount
@@ -0,0 +1,91 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from users.models import Subscribe
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def fan_out(recipe_ids):
+    """Раскладывает рецепты по лентам подписчиков пачками подписок.
+
+    Каждая пачка вставляется отдельной транзакцией, чтобы раскладка
+    для автора с большим числом подписчиков не держала долгих блокировок.
+    """
+    from .models import FeedEntry
+
+    after = 0
+    while after is not None:
+        after = FeedEntry.objects.fan_out_batch(
+            recipe_ids, after, settings.FEED_FANOUT_BATCH_SIZE)
+
+
+def resume_fan_out(job_id):
+    """Продолжает сохранённую раскладку FeedFanOut с её курсора.
+
+    Каждая пачка обрабатывается в своей транзакции под блокировкой
+    записи: если раскладку одновременно продолжает другой процесс,
+    пачки не повторяются, а занятая запись пропускается.
+    """
+    from .models import FeedEntry, FeedFanOut
+
+    while True:
+        with transaction.atomic():
+            job = FeedFanOut.objects.select_for_update(
+                skip_locked=True).filter(pk=job_id).first()
+            if job is None:
+                return
+            after = FeedEntry.objects.fan_out_batch(
+                job.recipe_ids, job.after, settings.FEED_FANOUT_BATCH_SIZE)
+            if after is None:
+                job.delete()
+                return
+            job.after = after
+            job.save(update_fields=('after',))
+
+
+def _fan_out_in_background(job_id):
+    close_old_connections()
+    try:
+        resume_fan_out(job_id)
+    except Exception:
+        logger.exception('Не удалось завершить раскладку %s по лентам',
+                         job_id)
+    finally:
+        close_old_connections()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1)
+    return _executor
+
+
+def _dispatch(recipe_ids):
+    followers = Subscribe.objects.filter(
+        author__recipes__in=recipe_ids).count()
+    if followers <= settings.FEED_FANOUT_SYNC_LIMIT:
+        fan_out(recipe_ids)
+    else:
+        from .models import FeedFanOut
+
+        job = FeedFanOut.objects.create(recipe_ids=recipe_ids)
+        _get_executor().submit(_fan_out_in_background, job.pk)
+
+
+def schedule_fan_out(recipe_ids):
+    """Раскладывает новые рецепты по лентам после фиксации транзакции.
+
+    Небольшие рассылки выполняются сразу, рецепты авторов с большим
+    числом подписчиков обрабатываются в фоновом потоке. Такая раскладка
+    сначала сохраняется в FeedFanOut: если процесс завершится раньше
+    неё, её продолжит команда resume_feed_fan_outs.
+    """
+    transaction.on_commit(partial(_dispatch, list(recipe_ids)))
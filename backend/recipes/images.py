@@ -0,0 +1,110 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+VARIANT_FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80},
+    'jpeg': {'format': 'JPEG', 'quality': 85, 'optimize': True,
+             'progressive': True},
+}
+
+_executor = None
+
+
+def variant_name(name, width, extension):
+    path = PurePosixPath(name)
+    return str(path.parent / 'variants' / f'{path.stem}_{width}.{extension}')
+
+
+def build_variants(name):
+    """Строит уменьшенные копии изображения. Выполняется в пуле процессов.
+
+    Возвращает словарь {формат: {ширина: имя файла}}.
+    """
+    with default_storage.open(name) as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image = image.convert('RGB')
+    variants = {}
+    for width in settings.IMAGE_VARIANT_WIDTHS:
+        resized = image
+        if image.width > width:
+            resized = image.resize(
+                (width, round(image.height * width / image.width)),
+                Image.LANCZOS
+            )
+        for extension, options in VARIANT_FORMATS.items():
+            buffer = BytesIO()
+            resized.save(buffer, **options)
+            target = variant_name(name, width, extension)
+            if default_storage.exists(target):
+                default_storage.delete(target)
+            default_storage.save(target, ContentFile(buffer.getvalue()))
+            variants.setdefault(extension, {})[str(width)] = target
+    return variants
+
+
+def delete_variants(variants):
+    for names in variants.values():
+        for name in names.values():
+            default_storage.delete(name)
+
+
+def _store_variants(recipe_id, name, future):
+    from .models import Recipe
+
+    try:
+        variants = future.result()
+    except Exception:
+        logger.exception('Не удалось обработать изображение %s', name)
+        return
+    close_old_connections()
+    try:
+        recipe = Recipe.objects.filter(pk=recipe_id, image=name).first()
+        if recipe:
+            recipe.image_variants = variants
+            recipe.save(update_fields=('image_variants',))
+    finally:
+        close_old_connections()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_PROCESS_WORKERS)
+    return _executor
+
+
+def _submit(recipe_id, name):
+    global _executor
+    try:
+        future = _get_executor().submit(build_variants, name)
+    except BrokenProcessPool:
+        _executor = None
+        future = _get_executor().submit(build_variants, name)
+    future.add_done_callback(partial(_store_variants, recipe_id, name))
+
+
+def schedule_variants(recipe):
+    """Ставит построение копий в очередь после фиксации транзакции.
+
+    До готовности копий сериализатор отдаёт оригинал изображения.
+    """
+    if not recipe.image:
+        return
+    if recipe.image_variants:
+        transaction.on_commit(partial(delete_variants, recipe.image_variants))
+        type(recipe).objects.filter(pk=recipe.pk).update(image_variants={})
+        recipe.image_variants = {}
+    transaction.on_commit(partial(_submit, recipe.pk, recipe.image.name))
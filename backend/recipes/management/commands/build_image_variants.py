@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import build_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Строит уменьшенные копии изображений рецептов, у которых их нет.'
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.filter(image_variants={}).exclude(
+            image='').only('pk', 'image')
+        built = 0
+        for recipe in recipes.iterator():
+            try:
+                recipe.image_variants = build_variants(recipe.image.name)
+            except OSError as error:
+                self.stderr.write(f'Рецепт {recipe.pk}: {error}')
+                continue
+            recipe.save(update_fields=('image_variants',))
+            built += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {built}'))
@@ -0,0 +1,122 @@
+import csv
+import json
+from pathlib import Path
+from time import monotonic
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.cache import INGREDIENTS, bump_version
+from recipes.constants import MAX_STR_LENGTH
+from recipes.copy import CHUNK_SIZE, copy_rows
+from recipes.models import Ingredient
+
+PROGRESS_EVERY = 100_000
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if len(row) >= 2:
+            yield row[0], row[1]
+
+
+def read_json(file):
+    """Построчно разбирает JSON-массив объектов, не загружая его целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    while True:
+        chunk = file.read(CHUNK_SIZE)
+        buffer += chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not started and position < len(buffer):
+                if buffer[position] != '[':
+                    raise CommandError('Ожидался JSON-массив.')
+                started = True
+                position += 1
+                continue
+            if position < len(buffer) and buffer[position] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise CommandError('Файл JSON обрезан или повреждён.')
+                break
+            yield item['name'], item['measurement_unit']
+        buffer = buffer[position:]
+        if not chunk:
+            return
+
+
+class Command(BaseCommand):
+    help = ('Загружает ингредиенты из CSV или JSON через COPY во временную '
+            'таблицу и добавляет отсутствующие в справочник.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу ingredients.csv/json')
+        parser.add_argument(
+            '--format',
+            choices=('csv', 'json'),
+            help='Формат файла, по умолчанию определяется по расширению.'
+        )
+        parser.add_argument(
+            '--if-empty',
+            action='store_true',
+            help='Ничего не делать, если справочник уже заполнен.'
+        )
+
+    def clean(self, rows):
+        self.loaded = self.skipped = 0
+        for name, unit in rows:
+            name, unit = name.strip(), unit.strip()
+            if (not name or not unit or len(name) > MAX_STR_LENGTH
+                    or len(unit) > MAX_STR_LENGTH):
+                self.skipped += 1
+                continue
+            self.loaded += 1
+            if self.loaded % PROGRESS_EVERY == 0:
+                self.stdout.write(f'Прочитано строк: {self.loaded}')
+            yield name, unit
+
+    def handle(self, *args, **options):
+        if options['if_empty'] and Ingredient.objects.exists():
+            self.stdout.write('Справочник ингредиентов уже заполнен.')
+            return
+        path = Path(options['path'])
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        readers = {'csv': read_csv, 'json': read_json}
+        if file_format not in readers:
+            raise CommandError(f'Неизвестный формат файла: {path.name}')
+
+        started = monotonic()
+        table = Ingredient._meta.db_table
+        with open(path, encoding='utf-8', newline='') as file, \
+                transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE ingredient_staging '
+                '(name text, measurement_unit text) ON COMMIT DROP'
+            )
+            copy_rows(cursor, 'ingredient_staging',
+                      ('name', 'measurement_unit'),
+                      self.clean(readers[file_format](file)))
+            copied = monotonic()
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT DISTINCT name, measurement_unit '
+                'FROM ingredient_staging '
+                'ON CONFLICT ON CONSTRAINT "unique ingredient" DO NOTHING'
+            )
+            created = cursor.rowcount
+        if created:
+            bump_version(INGREDIENTS)
+        finished = monotonic()
+        self.stdout.write(
+            f'Прочитано: {self.loaded}, пропущено: {self.skipped}, '
+            f'добавлено: {created}. COPY: {copied - started:.2f} с, '
+            f'вставка: {finished - copied:.2f} с.'
+        )
+        self.stdout.write(self.style.SUCCESS('Ингредиенты загружены.'))
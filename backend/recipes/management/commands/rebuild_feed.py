@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import FeedEntry
+
+
+class Command(BaseCommand):
+    help = ('Заново собирает ленты подписок из подписок и рецептов, '
+            'например после сбоя фоновой раскладки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=settings.FEED_BACKFILL_LIMIT,
+            help='Сколько последних рецептов каждого автора попадает в ленту.'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            FeedEntry.objects.rebuild(options['limit'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Ленты пересобраны, записей: {FeedEntry.objects.count()}.'))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import ShoppingCartIngredient
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает агрегированные списки покупок и сверяет их '
+            'с рецептами в корзинах пользователей.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сверить данные, не пересчитывая их.'
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            with transaction.atomic():
+                ShoppingCartIngredient.objects.rebuild()
+            self.stdout.write('Списки покупок пересчитаны.')
+
+        live = {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount
+            in ShoppingCartIngredient.objects.live_totals()
+        }
+        stored = ShoppingCartIngredient.objects.values_list(
+            'user', 'ingredient', 'amount').iterator()
+        mismatches = 0
+        for user_id, ingredient_id, amount in stored:
+            expected = live.pop((user_id, ingredient_id), None)
+            if expected != amount:
+                mismatches += 1
+                self.stderr.write(
+                    f'Пользователь {user_id}, ингредиент {ingredient_id}: '
+                    f'{amount} вместо {expected}'
+                )
+        for (user_id, ingredient_id), expected in live.items():
+            mismatches += 1
+            self.stderr.write(
+                f'Пользователь {user_id}, ингредиент {ingredient_id}: '
+                f'нет записи, ожидалось {expected}'
+            )
+        if mismatches:
+            raise CommandError(f'Найдено расхождений: {mismatches}')
+        self.stdout.write(self.style.SUCCESS('Расхождений не найдено.'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = ('Сверяет счётчики избранного и корзин у рецептов с фактическими '
+            'данными и исправляет расхождения. Рассчитана на периодический '
+            'запуск, например из cron.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сверить данные, не исправляя их.'
+        )
+
+    def handle(self, *args, **options):
+        mismatches = Recipe.objects.reconcile_counters(check=options['check'])
+        if options['check'] and mismatches:
+            raise CommandError(
+                f'Рецептов с неверными счётчиками: {mismatches}')
+        if mismatches:
+            self.stdout.write(f'Исправлено рецептов: {mismatches}.')
+        self.stdout.write(self.style.SUCCESS('Счётчики в порядке.'))
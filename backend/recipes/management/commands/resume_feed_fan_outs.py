@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from recipes.feed import resume_fan_out
+from recipes.models import FeedFanOut
+
+
+class Command(BaseCommand):
+    help = ('Продолжает фоновые раскладки рецептов по лентам, прерванные '
+            'перезапуском воркеров, с места остановки.')
+
+    def handle(self, *args, **options):
+        job_ids = list(FeedFanOut.objects.values_list('pk', flat=True))
+        for job_id in job_ids:
+            resume_fan_out(job_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'Раскладок продолжено: {len(job_ids)}.'))
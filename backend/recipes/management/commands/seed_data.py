@@ -0,0 +1,307 @@
+import random
+from datetime import timedelta
+from math import gcd
+from time import monotonic
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from recipes.cache import INGREDIENTS, TAGS, bump_version
+from recipes.copy import copy_rows
+from recipes.models import (FavoritedRecipe, FeedEntry, Ingredient,
+                            IngredientAmount, Recipe, ShoppingCartIngredient,
+                            ShoppingList, Tag)
+from users.models import Subscribe, User
+
+WORDS = ('борщ', 'суп', 'салат', 'пирог', 'каша', 'омлет', 'плов', 'блины',
+         'котлеты', 'рагу', 'запеканка', 'паста', 'курица', 'рыба', 'грибы',
+         'овощи', 'сырники', 'щи', 'пельмени', 'торт')
+UNITS = ('г', 'кг', 'мл', 'л', 'шт.', 'ст. л.', 'ч. л.', 'по вкусу')
+
+
+class Zipf:
+    """Выбор из n объектов с вероятностью, убывающей как 1 / rank ** s.
+
+    Ранг берётся обратной функцией непрерывного степенного распределения,
+    поэтому выборка не требует таблицы весов и работает за O(1) при любом
+    n. Ранги переставляются аффинной перестановкой, чтобы популярные
+    объекты не совпадали с первыми по порядку.
+    """
+
+    def __init__(self, n, exponent, rng):
+        self.n = n
+        self.exponent = exponent
+        self.random = rng.random
+        self.step = rng.randrange(1, n) if n > 1 else 1
+        while gcd(self.step, n) != 1:
+            self.step += 1
+        self.offset = rng.randrange(n)
+
+    def rank(self):
+        u = self.random()
+        if self.exponent == 1:
+            return min(int(self.n ** u), self.n) - 1
+        power = 1 - self.exponent
+        return min(int(((self.n ** power - 1) * u + 1) ** (1 / power)),
+                   self.n) - 1
+
+    def __call__(self):
+        """Индекс объекта от 0 до n - 1."""
+        return (self.rank() * self.step + self.offset) % self.n
+
+    def sample(self, k):
+        """До k различных индексов; для самых популярных повторы
+        отбрасываются, поэтому попыток не больше 4 * k."""
+        chosen = set()
+        for _ in range(4 * k):
+            chosen.add(self())
+            if len(chosen) == k:
+                break
+        return chosen
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими данными: пользователи, рецепты, '
+            'теги, ингредиенты, избранное, корзины и подписки. '
+            'Популярность рецептов, число подписчиков и рецептов у автора '
+            'распределены по закону Ципфа. Строки загружаются через COPY, '
+            'результат определяется параметром --seed. '
+            'Списки покупок и ленты пересчитываются только у созданных '
+            'пользователей. Не запускайте на рабочей базе.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--recipes', type=int, default=50_000)
+        parser.add_argument('--tags', type=int, default=12)
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument(
+            '--ingredients-per-recipe', type=int, nargs=2, default=(3, 12),
+            metavar=('MIN', 'MAX'))
+        parser.add_argument(
+            '--favorites', type=float, default=20,
+            help='Среднее число рецептов в избранном у пользователя.')
+        parser.add_argument(
+            '--cart', type=float, default=3,
+            help='Среднее число рецептов в корзине у пользователя.')
+        parser.add_argument(
+            '--subscriptions', type=float, default=10,
+            help='Среднее число подписок у пользователя.')
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Показатель распределения Ципфа.')
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределены даты публикации.')
+        parser.add_argument(
+            '--batch-size', type=int, default=100_000,
+            help='Размер пакета при пересчёте поисковых векторов.')
+        parser.add_argument(
+            '--random-page-cost',
+            type=float,
+            default=1.1,
+            help='Стоимость случайного чтения страницы на время загрузки: '
+                 'с ней пересчёт векторов ищет ингредиенты по индексу.'
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='Префикс имён пользователей, тегов и ингредиентов.')
+
+    def step(self, message, started):
+        self.stdout.write(f'{message}: {monotonic() - started:.1f} с')
+        return monotonic()
+
+    def reserve_ids(self, cursor, model, count):
+        """Первый id для count строк с явными ключами и сдвиг
+        последовательности за них. Таблица блокируется до конца
+        транзакции, чтобы ключи не заняли параллельные вставки."""
+        table = model._meta.db_table
+        cursor.execute(f'LOCK TABLE {table} IN EXCLUSIVE MODE')
+        cursor.execute(f'SELECT COALESCE(MAX(id), 0) + 1 FROM {table}')
+        first = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT setval(pg_get_serial_sequence(%s, 'id'), %s)",
+            (table, first + count - 1))
+        return first
+
+    def dates(self, count, now, days):
+        start = now - timedelta(days=days)
+        span = timedelta(days=days) / max(count, 1)
+        return (start + span * i for i in range(count))
+
+    def per_user(self, mean):
+        return int(self.rng.expovariate(1 / mean)) if mean > 0 else 0
+
+    def seed_users(self, cursor, options, now):
+        prefix, count = options['prefix'], options['users']
+        first = self.reserve_ids(cursor, User, count)
+        rows = (
+            (first + i, '!', False, False, True, joined,
+             f'{prefix}_{i}@example.com', f'{prefix}_{i}',
+             self.rng.choice(WORDS).capitalize(), f'Пользователь {i}')
+            for i, joined in enumerate(self.dates(count, now,
+                                                  options['days']))
+        )
+        copy_rows(cursor, User._meta.db_table, (
+            'id', 'password', 'is_superuser', 'is_staff', 'is_active',
+            'date_joined', 'email', 'username', 'first_name', 'last_name'
+        ), rows)
+        return first
+
+    def seed_catalogs(self, options):
+        prefix = options['prefix']
+        colors = set(Tag.objects.values_list('color', flat=True))
+        tags = []
+        for i in range(options['tags']):
+            color = f'#{self.rng.getrandbits(24):06X}'
+            while color in colors:
+                color = f'#{self.rng.getrandbits(24):06X}'
+            colors.add(color)
+            tags.append(Tag(name=f'{prefix} {i}', color=color,
+                            slug=f'{prefix}-{i}'))
+        tags = Tag.objects.bulk_create(tags)
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'{prefix} {self.rng.choice(WORDS)} {i}',
+                       measurement_unit=self.rng.choice(UNITS))
+            for i in range(options['ingredients'])
+        )
+        return [tag.pk for tag in tags], [item.pk for item in ingredients]
+
+    def recipe_tags(self, options, tag_ids):
+        """Теги каждого рецепта. Генератор со своим зерном, поэтому при
+        повторном проходе даёт те же теги без хранения их в памяти."""
+        rng = random.Random(f'{options["seed"]}:tags')
+        tag = Zipf(len(tag_ids), options['zipf'], rng)
+        for _ in range(options['recipes']):
+            yield sorted(tag_ids[index]
+                         for index in tag.sample(rng.randint(1, 3)))
+
+    def seed_recipes(self, cursor, options, now, first_user, tag_ids):
+        first = self.reserve_ids(cursor, Recipe, options['recipes'])
+        author = Zipf(options['users'], options['zipf'], self.rng)
+        copy_rows(cursor, Recipe._meta.db_table, (
+            'id', 'author_id', 'name', 'image', 'text', 'cooking_time',
+            'pub_date', 'image_variants', 'tag_ids', 'favorites_count',
+            'shopping_cart_count'
+        ), (
+            (first + i, first_user + author(),
+             ' '.join(self.rng.sample(WORDS, 2)).capitalize(),
+             'recipes/images/seed.jpg',
+             ' '.join(self.rng.choices(WORDS, k=30)),
+             self.rng.randint(5, 180), published, '{}',
+             '{' + ','.join(map(str, tags)) + '}', 0, 0)
+            for i, (published, tags) in enumerate(zip(
+                self.dates(options['recipes'], now, options['days']),
+                self.recipe_tags(options, tag_ids)))
+        ))
+        return first
+
+    def seed_recipe_links(self, cursor, options, first_recipe, tag_ids,
+                          ingredient_ids):
+        through = Recipe.tags.through
+        copy_rows(cursor, through._meta.db_table, ('recipe_id', 'tag_id'), (
+            (first_recipe + i, tag)
+            for i, tags in enumerate(self.recipe_tags(options, tag_ids))
+            for tag in tags
+        ))
+        ingredient = Zipf(len(ingredient_ids), options['zipf'], self.rng)
+        low, high = options['ingredients_per_recipe']
+        copy_rows(cursor, IngredientAmount._meta.db_table, (
+            'recipe_id', 'ingredient_id', 'amount'
+        ), (
+            (first_recipe + i, ingredient_ids[index],
+             self.rng.randint(1, 500))
+            for i in range(options['recipes'])
+            for index in ingredient.sample(self.rng.randint(low, high))
+        ))
+
+    def seed_user_recipes(self, cursor, options, model, mean, first_user,
+                          first_recipe):
+        recipe = Zipf(options['recipes'], options['zipf'], self.rng)
+        limit = options['recipes']
+        return copy_rows(cursor, model._meta.db_table, (
+            'user_id', 'recipe_id'
+        ), (
+            (first_user + user, first_recipe + index)
+            for user in range(options['users'])
+            for index in recipe.sample(min(self.per_user(mean), limit))
+        ))
+
+    def seed_subscriptions(self, cursor, options, now, first_user):
+        author = Zipf(options['users'], options['zipf'], self.rng)
+        limit = options['users'] - 1
+        return copy_rows(cursor, Subscribe._meta.db_table, (
+            'user_id', 'author_id', 'created'
+        ), (
+            (first_user + user, first_user + index, now)
+            for user in range(options['users'])
+            for index in author.sample(
+                min(self.per_user(options['subscriptions']), limit))
+            if index != user
+        ))
+
+    def update_search_vectors(self, first_recipe, options):
+        last = first_recipe + options['recipes']
+        for start in range(first_recipe, last, options['batch_size']):
+            Recipe.objects.filter(pk__gte=start, pk__lt=min(
+                start + options['batch_size'], last)).update_search_vector()
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Загрузка через COPY работает только '
+                               'с PostgreSQL.')
+        if options['users'] < 2 or options['recipes'] < 1:
+            raise CommandError('Нужно хотя бы 2 пользователя и 1 рецепт.')
+        if options['tags'] < 1 or options['ingredients'] < 1:
+            raise CommandError('Нужен хотя бы 1 тег и 1 ингредиент.')
+        if User.objects.filter(
+                username__startswith=f'{options["prefix"]}_').exists():
+            raise CommandError(
+                f'Данные с префиксом {options["prefix"]} уже есть, '
+                'укажите другой --prefix.')
+        self.rng = random.Random(options['seed'])
+        now = timezone.now()
+        started = total = monotonic()
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute('SET LOCAL random_page_cost = %s',
+                           (options['random_page_cost'],))
+            first_user = self.seed_users(cursor, options, now)
+            started = self.step(f'Пользователи ({options["users"]})',
+                                started)
+            tag_ids, ingredient_ids = self.seed_catalogs(options)
+            first_recipe = self.seed_recipes(
+                cursor, options, now, first_user, tag_ids)
+            started = self.step(f'Рецепты ({options["recipes"]})', started)
+            self.seed_recipe_links(cursor, options, first_recipe, tag_ids,
+                                   ingredient_ids)
+            started = self.step('Теги и ингредиенты рецептов', started)
+            favorites = self.seed_user_recipes(
+                cursor, options, FavoritedRecipe, options['favorites'],
+                first_user, first_recipe)
+            started = self.step(f'Избранное ({favorites})', started)
+            carts = self.seed_user_recipes(
+                cursor, options, ShoppingList, options['cart'],
+                first_user, first_recipe)
+            started = self.step(f'Корзины ({carts})', started)
+            subscriptions = self.seed_subscriptions(
+                cursor, options, now, first_user)
+            started = self.step(f'Подписки ({subscriptions})', started)
+            cursor.execute('ANALYZE')
+            self.update_search_vectors(first_recipe, options)
+            seeded = Recipe.objects.filter(pk__gte=first_recipe)
+            seeded.reconcile_counters()
+            started = self.step('Поисковые векторы и счётчики', started)
+            seeded_users = User.objects.filter(
+                pk__gte=first_user, pk__lt=first_user + options['users'])
+            ShoppingCartIngredient.objects.rebuild(users=seeded_users)
+            FeedEntry.objects.rebuild(settings.FEED_BACKFILL_LIMIT,
+                                      users=seeded_users)
+            started = self.step('Списки покупок и ленты', started)
+            cursor.execute('ANALYZE')
+            self.step('Статистика планировщика', started)
+        bump_version(TAGS)
+        bump_version(INGREDIENTS)
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные загружены за {monotonic() - total:.1f} с.'))
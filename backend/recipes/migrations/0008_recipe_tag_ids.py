@@ -0,0 +1,41 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:26
+
+from django.contrib.postgres.aggregates import ArrayAgg
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_tag_ids(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    tag_ids = Recipe.tags.through.objects.filter(
+        recipe=models.OuterRef('pk')
+    ).order_by().values('recipe').annotate(
+        ids=ArrayAgg('tag_id', ordering='tag_id')
+    ).values('ids')
+    Recipe.objects.update(tag_ids=Coalesce(
+        models.Subquery(tag_ids),
+        models.Value([], output_field=django.contrib.postgres.fields.ArrayField(
+            models.IntegerField()))
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_author_tags_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='tag_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, editable=False, size=None, verbose_name='Идентификаторы тегов'),
+        ),
+        migrations.RunPython(fill_tag_ids, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['tag_ids'], name='recipe_tag_ids_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+BACKFILL_FEED = '''
+    INSERT INTO recipes_feedentry (user_id, recipe_id, author_id, pub_date)
+    SELECT user_id, id, author_id, pub_date FROM (
+        SELECT subscribe.user_id, recipe.id, recipe.author_id,
+               recipe.pub_date,
+               ROW_NUMBER() OVER (
+                   PARTITION BY subscribe.id
+                   ORDER BY recipe.pub_date DESC, recipe.id DESC
+               ) AS row_number
+        FROM users_subscribe subscribe
+        JOIN recipes_recipe recipe ON recipe.author_id = subscribe.author_id
+    ) ranked
+    WHERE row_number <= 200
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0008_recipe_tag_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи ленты',
+                'ordering': ('-pub_date', '-recipe'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-pub_date', '-recipe'], name='feed_user_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', 'author'], name='feed_user_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique feed entry'),
+        ),
+        migrations.RunSQL(BACKFILL_FEED, migrations.RunSQL.noop),
+    ]
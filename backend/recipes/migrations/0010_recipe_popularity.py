@@ -0,0 +1,36 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:36
+
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_feedentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shopping_cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В корзинах'),
+        ),
+        migrations.RunSQL(
+            'UPDATE recipes_recipe recipe SET '
+            'favorites_count = (SELECT count(*) FROM recipes_favoritedrecipe '
+            'WHERE recipe_id = recipe.id), '
+            'shopping_cart_count = (SELECT count(*) FROM recipes_shoppinglist '
+            'WHERE recipe_id = recipe.id)',
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(django.db.models.expressions.OrderBy(django.db.models.expressions.CombinedExpression(django.db.models.expressions.F('favorites_count'), '+', django.db.models.expressions.F('shopping_cart_count')), descending=True), django.db.models.expressions.OrderBy(django.db.models.expressions.F('pub_date'), descending=True), django.db.models.expressions.OrderBy(django.db.models.expressions.F('id'), descending=True), name='recipe_popularity_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:34
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipe_popularity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedFanOut',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe_ids', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), size=None, verbose_name='Рецепты')),
+                ('after', models.BigIntegerField(default=0, verbose_name='Последняя обработанная подписка')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создана')),
+            ],
+            options={
+                'verbose_name': 'Раскладка по лентам',
+                'verbose_name_plural': 'Раскладки по лентам',
+                'ordering': ('id',),
+            },
+        ),
+    ]
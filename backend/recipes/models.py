@@ -1,9 +1,15 @@
 from colorfield.fields import ColorField
+from django.contrib.postgres.aggregates import ArrayAgg, StringAgg
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models.functions import Coalesce, Greatest
 
-from users.models import User
-from .constants import (MAX_COOKING_TIME, MAX_STR_LENGTH, MIN_VALUE)
+from users.models import Subscribe, User
+from .constants import (MAX_COOKING_TIME, MAX_STR_LENGTH, MIN_VALUE,
+                        SEARCH_CONFIG)
 
 
 class Tag(models.Model):
@@ -56,10 +62,107 @@ class Ingredient(models.Model):
         return (f'{self.name}')
 
 
+COUNTER_FIELDS = ('favorites_count', 'shopping_cart_count')
+# Поля, которые пишутся только отдельными UPDATE: счётчики, уменьшенные
+# копии из пула процессов, поисковый вектор и список тегов.
+MAINTAINED_FIELDS = (*COUNTER_FIELDS, 'image_variants', 'search_vector',
+                     'tag_ids')
+
+
+def popularity():
+    """Популярность рецепта: сколько раз он в избранном и в корзинах."""
+    return models.F('favorites_count') + models.F('shopping_cart_count')
+
+
+class RecipeQuerySet(models.QuerySet):
+
+    def update_search_vector(self):
+        """Пересчитывает поисковый вектор: название, ингредиенты, текст."""
+        ingredient_names = IngredientAmount.objects.filter(
+            recipe=models.OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            names=StringAgg('ingredient__name', ' ')
+        ).values('names')
+        return self.update(search_vector=(
+            SearchVector('name', weight='A', config=SEARCH_CONFIG)
+            + SearchVector(models.Subquery(ingredient_names), weight='B',
+                           config=SEARCH_CONFIG)
+            + SearchVector('text', weight='C', config=SEARCH_CONFIG)
+        ))
+
+    def reconcile_counters(self, check=False):
+        """Сверяет счётчики с таблицами избранного и корзин.
+
+        Исправляет расхождения (или только считает их при check=True)
+        и возвращает число рецептов с неверными счётчиками.
+        """
+        recipes = self.order_by().values('pk')
+        sql, params = recipes.query.sql_with_params()
+        actual = f'''
+            SELECT recipe.id,
+                (SELECT count(*) FROM {FavoritedRecipe._meta.db_table}
+                 WHERE recipe_id = recipe.id) AS favorites,
+                (SELECT count(*) FROM {ShoppingList._meta.db_table}
+                 WHERE recipe_id = recipe.id) AS carts
+            FROM {Recipe._meta.db_table} recipe
+            WHERE recipe.id IN ({sql})
+        '''
+        table = Recipe._meta.db_table
+        with connection.cursor() as cursor:
+            if check:
+                cursor.execute(f'''
+                    SELECT count(*) FROM {table} recipe
+                    JOIN ({actual}) actual ON actual.id = recipe.id
+                    WHERE (recipe.favorites_count, recipe.shopping_cart_count)
+                          IS DISTINCT FROM (actual.favorites, actual.carts)
+                ''', params)
+                return cursor.fetchone()[0]
+            cursor.execute(f'''
+                UPDATE {table} recipe
+                SET favorites_count = actual.favorites,
+                    shopping_cart_count = actual.carts
+                FROM ({actual}) actual
+                WHERE actual.id = recipe.id
+                  AND (recipe.favorites_count, recipe.shopping_cart_count)
+                      IS DISTINCT FROM (actual.favorites, actual.carts)
+            ''', params)
+            return cursor.rowcount
+
+    def delete(self):
+        """Корзины с рецептами удаляются каскадом без сигналов, поэтому
+        ингредиенты рецептов вычитаются из списков покупок заранее,
+        одним запросом на весь набор."""
+        with transaction.atomic(using=self.db, savepoint=False):
+            ShoppingCartIngredient.objects.apply_carts(
+                ShoppingList.objects.filter(recipe__in=self.values('pk')),
+                -1)
+            return super().delete()
+
+    def update_tag_ids(self):
+        """Пересчитывает денормализованный список тегов рецепта."""
+        through = Recipe.tags.through
+        tag_ids = through.objects.filter(
+            recipe=models.OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            ids=ArrayAgg('tag_id', ordering='tag_id')
+        ).values('ids')
+        return self.update(tag_ids=Coalesce(
+            models.Subquery(tag_ids),
+            models.Value([], output_field=ArrayField(models.IntegerField()))
+        ))
+
+
 class Recipe(models.Model):
     tags = models.ManyToManyField(
         Tag,
         verbose_name='Теги')
+    tag_ids = ArrayField(
+        models.IntegerField(),
+        default=list,
+        blank=True,
+        editable=False,
+        verbose_name='Идентификаторы тегов'
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -80,6 +183,12 @@ class Recipe(models.Model):
         default=None,
         verbose_name='Изображение'
     )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные копии изображения'
+    )
     text = models.TextField(verbose_name='Описание')
     cooking_time = models.PositiveIntegerField(
         validators=(
@@ -89,15 +198,61 @@ class Recipe(models.Model):
         verbose_name='Время приготовления'
     )
     pub_date = models.DateTimeField(auto_now_add=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном'
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В корзинах'
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(fields=('-pub_date', '-id'),
+                         name='recipe_pub_date_id_idx'),
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='recipe_author_pub_date_idx'),
+            GinIndex(fields=('search_vector',),
+                     name='recipe_search_vector_idx'),
+            GinIndex(fields=('tag_ids',), name='recipe_tag_ids_idx'),
+            models.Index(popularity().desc(), models.F('pub_date').desc(),
+                         models.F('id').desc(),
+                         name='recipe_popularity_idx'),
+            GinIndex(fields=('name',), opclasses=('gin_trgm_ops',),
+                     name='recipe_name_trgm_idx'),
+        )
 
     def __str__(self):
         return (f'Рецепт  {self.name} пользователя {self.author}')
 
+    def save(self, *args, **kwargs):
+        """Поля MAINTAINED_FIELDS обновляются только отдельными UPDATE,
+        поэтому при сохранении существующего рецепта они не
+        перезаписываются устаревшими значениями из памяти: например,
+        правка не затирает копии изображения, построенные во время неё."""
+        if (not self._state.adding and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in MAINTAINED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @transaction.atomic(savepoint=False)
+    def delete(self, *args, **kwargs):
+        ShoppingCartIngredient.objects.apply_recipe(self.pk, -1)
+        return super().delete(*args, **kwargs)
+
 
 class IngredientAmount(models.Model):
     recipe = models.ForeignKey(
@@ -131,7 +286,140 @@ class IngredientAmount(models.Model):
                 f'{self.ingredient.measurement_unit} {self.ingredient.name}')
 
 
-class FavoritedRecipe(models.Model):
+class UserRecipeQuerySet(models.QuerySet):
+    """Связи пользователь-рецепт, удаление которых учитывается
+    в счётчиках рецептов."""
+
+    def decrement_counters(self):
+        """Вычитает выбранные связи из счётчиков рецептов одним UPDATE.
+
+        Счётчик не опускается ниже нуля, даже если разошёлся с таблицей
+        связей; точное значение восстанавливает reconcile_counters.
+        """
+        field = self.model._default_manager.counter_field
+        removed = self.order_by().values('recipe_id').annotate(
+            removed=models.Count('pk')).values('recipe_id', 'removed')
+        sql, params = removed.query.sql_with_params()
+        table = Recipe._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f'''
+                UPDATE {table} recipe
+                SET {field} = GREATEST(recipe.{field} - removed.removed, 0)
+                FROM ({sql}) removed
+                WHERE removed.recipe_id = recipe.id
+            ''', params)
+
+    def delete(self):
+        with transaction.atomic(using=self.db, savepoint=False):
+            self.decrement_counters()
+            return super().delete()
+
+
+class UserRecipeManager(models.Manager.from_queryset(UserRecipeQuerySet)):
+    """Пакетные операции со связями пользователь-рецепт.
+
+    Поддерживает счётчик counter_field у рецептов в актуальном виде.
+    Поле задаётся атрибутом класса, потому что Django создаёт менеджеры
+    связанных объектов (user.favorited) без аргументов.
+    """
+    counter_field = None
+
+    def update_counters(self, recipe_ids, delta):
+        recipe_ids = list(recipe_ids)
+        if recipe_ids:
+            Recipe.objects.filter(pk__in=recipe_ids).update(**{
+                self.counter_field: Greatest(
+                    models.F(self.counter_field) + delta, 0)})
+
+    @transaction.atomic
+    def add_many(self, user_id, recipe_ids):
+        """Добавляет рецепты одним INSERT ... ON CONFLICT DO NOTHING.
+
+        Возвращает существующие рецепты из списка и те из них,
+        которые действительно добавлены.
+        """
+        table = self.model._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f'''
+                WITH found AS (
+                    SELECT id FROM {Recipe._meta.db_table}
+                    WHERE id = ANY(%s)
+                ), inserted AS (
+                    INSERT INTO {table} (user_id, recipe_id)
+                    SELECT %s, id FROM found
+                    ON CONFLICT (user_id, recipe_id) DO NOTHING
+                    RETURNING recipe_id
+                )
+                SELECT found.id, inserted.recipe_id IS NOT NULL
+                FROM found LEFT JOIN inserted ON inserted.recipe_id = found.id
+            ''', [list(recipe_ids), user_id])
+            rows = cursor.fetchall()
+        added = {recipe_id for recipe_id, inserted in rows if inserted}
+        self.update_counters(added, 1)
+        return {recipe_id for recipe_id, _ in rows}, added
+
+    @transaction.atomic
+    def remove_many(self, user_id, recipe_ids):
+        """Удаляет рецепты одним DELETE, возвращает удалённые."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.model._meta.db_table} '
+                'WHERE user_id = %s AND recipe_id = ANY(%s) '
+                'RETURNING recipe_id', [user_id, list(recipe_ids)]
+            )
+            removed = {recipe_id for recipe_id, in cursor.fetchall()}
+        self.update_counters(removed, -1)
+        return removed
+
+
+class FavoritedRecipeManager(UserRecipeManager):
+    counter_field = 'favorites_count'
+
+
+class ShoppingListQuerySet(UserRecipeQuerySet):
+
+    def delete(self):
+        """Перед удалением вычитает рецепты из списков покупок."""
+        with transaction.atomic(using=self.db, savepoint=False):
+            ShoppingCartIngredient.objects.apply_carts(self, -1)
+            return super().delete()
+
+
+class ShoppingListManager(UserRecipeManager.from_queryset(
+        ShoppingListQuerySet)):
+    """Пакетные операции с корзиной, согласованные со списком покупок."""
+    counter_field = 'shopping_cart_count'
+
+    @transaction.atomic
+    def add_many(self, user_id, recipe_ids):
+        found, added = super().add_many(user_id, recipe_ids)
+        ShoppingCartIngredient.objects.apply_recipes(added, 1, user_id)
+        return found, added
+
+    @transaction.atomic
+    def remove_many(self, user_id, recipe_ids):
+        ShoppingCartIngredient.objects.apply_recipes(recipe_ids, -1, user_id)
+        return super().remove_many(user_id, recipe_ids)
+
+
+class UserRecipe(models.Model):
+    """Связь пользователь-рецепт со счётчиком у рецепта.
+
+    Счётчик уменьшается в delete() объекта и набора объектов, а не
+    в post_delete: получатель сигнала отключил бы быстрое каскадное
+    удаление связей вместе с рецептом или пользователем.
+    """
+
+    class Meta:
+        abstract = True
+
+    @transaction.atomic(savepoint=False)
+    def delete(self, *args, **kwargs):
+        type(self).objects.update_counters((self.recipe_id,), -1)
+        return super().delete(*args, **kwargs)
+
+
+class FavoritedRecipe(UserRecipe):
     user = models.ForeignKey(
         User,
         related_name='favorited',
@@ -145,6 +433,8 @@ class FavoritedRecipe(models.Model):
         verbose_name='Рецепт'
     )
 
+    objects = FavoritedRecipeManager()
+
     class Meta:
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранное'
@@ -156,7 +446,7 @@ class FavoritedRecipe(models.Model):
         )
 
 
-class ShoppingList(models.Model):
+class ShoppingList(UserRecipe):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -170,6 +460,8 @@ class ShoppingList(models.Model):
         verbose_name='Рецепт'
     )
 
+    objects = ShoppingListManager()
+
     class Meta:
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Список покупок'
@@ -182,3 +474,273 @@ class ShoppingList(models.Model):
     def __str__(self):
         return (f'Рецепт "{self.recipe.name}" в'
                 f' списке покупок пользователя {self.user.username}.')
+
+    @transaction.atomic(savepoint=False)
+    def delete(self, *args, **kwargs):
+        ShoppingCartIngredient.objects.apply_recipe(
+            self.recipe_id, -1, self.user_id)
+        return super().delete(*args, **kwargs)
+
+
+class ShoppingCartIngredientManager(models.Manager):
+
+    def apply_recipe(self, recipe_id, sign, user_id=None):
+        """Добавляет (sign=1) или вычитает (sign=-1) ингредиенты рецепта.
+
+        Затрагиваются списки покупок всех пользователей, у которых рецепт
+        лежит в корзине, либо только пользователя user_id. При вычитании
+        строки списка покупок должны ещё существовать.
+        """
+        self.apply_recipes((recipe_id,), sign, user_id)
+
+    def apply_recipes(self, recipe_ids, sign, user_id=None):
+        """То же для нескольких рецептов одним запросом."""
+        recipe_ids = list(recipe_ids)
+        if not recipe_ids:
+            return
+        carts = ShoppingList.objects.filter(recipe_id__in=recipe_ids)
+        if user_id:
+            carts = carts.filter(user_id=user_id)
+        self.apply_carts(carts, sign)
+
+    def apply_carts(self, carts, sign):
+        """Добавляет или вычитает ингредиенты строк корзины из набора
+        carts в списки покупок их владельцев."""
+        table = self.model._meta.db_table
+        sql, params = carts.order_by().values(
+            'user_id', 'recipe_id').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'''
+                INSERT INTO {table} (user_id, ingredient_id, amount)
+                SELECT cart.user_id, amount.ingredient_id,
+                       %s * SUM(amount.amount)
+                FROM ({sql}) cart
+                JOIN {IngredientAmount._meta.db_table} amount
+                  ON amount.recipe_id = cart.recipe_id
+                GROUP BY cart.user_id, amount.ingredient_id
+                ON CONFLICT (user_id, ingredient_id)
+                DO UPDATE SET amount = {table}.amount + EXCLUDED.amount
+            ''', (sign, *params))
+        if sign < 0:
+            self.filter(amount__lte=0,
+                        user__in=carts.order_by().values('user_id')).delete()
+
+    def apply_amounts(self, recipe_id, changes):
+        """Применяет изменения количеств {ingredient_id: разница}
+        к спискам покупок всех, у кого рецепт лежит в корзине."""
+        if not changes:
+            return
+        table = self.model._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f'''
+                INSERT INTO {table} (user_id, ingredient_id, amount)
+                SELECT cart.user_id, change.ingredient_id, change.amount
+                FROM {ShoppingList._meta.db_table} cart
+                CROSS JOIN unnest(%s::bigint[], %s::integer[])
+                  AS change (ingredient_id, amount)
+                WHERE cart.recipe_id = %s
+                ON CONFLICT (user_id, ingredient_id)
+                DO UPDATE SET amount = {table}.amount + EXCLUDED.amount
+            ''', [list(changes), list(changes.values()), recipe_id])
+        if any(amount < 0 for amount in changes.values()):
+            self.filter(
+                amount__lte=0,
+                ingredient_id__in=list(changes),
+                user__shopping_cart__recipe_id=recipe_id
+            ).delete()
+
+    def rebuild(self, users=None):
+        """Пересчитывает списки покупок пользователей users (набора
+        id или запроса) или всех пользователей из связанных таблиц."""
+        rows = self.all()
+        carts = ShoppingList.objects.all()
+        if users is not None:
+            rows = rows.filter(user__in=users)
+            carts = carts.filter(user__in=users)
+        rows.delete()
+        self.apply_carts(carts, 1)
+
+    def live_totals(self):
+        return IngredientAmount.objects.filter(
+            recipe__recipe_shopping_cart__isnull=False
+        ).values_list(
+            'recipe__recipe_shopping_cart__user', 'ingredient'
+        ).annotate(
+            models.Sum('amount')
+        ).order_by().iterator()
+
+
+class ShoppingCartIngredient(models.Model):
+    """Суммарное количество ингредиента в списке покупок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_ingredients',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_ingredients',
+        verbose_name='Ингредиент'
+    )
+    amount = models.IntegerField(verbose_name='Количество')
+
+    objects = ShoppingCartIngredientManager()
+
+    class Meta:
+        verbose_name = 'Ингредиент списка покупок'
+        verbose_name_plural = 'Ингредиенты списка покупок'
+        ordering = ('id',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique shopping cart ingredient'),)
+
+    def __str__(self):
+        return (f'{self.ingredient.name} ({self.amount} '
+                f'{self.ingredient.measurement_unit}) в списке покупок '
+                f'пользователя {self.user.username}')
+
+
+class FeedEntryManager(models.Manager):
+
+    def fan_out_batch(self, recipe_ids, after=0, limit=None):
+        """Раскладывает рецепты в ленты подписчиков их авторов.
+
+        Обрабатывает не больше limit подписок с id больше after и
+        возвращает id последней обработанной подписки или None.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f'''
+                WITH batch AS (
+                    SELECT id, user_id, author_id
+                    FROM {Subscribe._meta.db_table}
+                    WHERE author_id IN (
+                        SELECT author_id FROM {Recipe._meta.db_table}
+                        WHERE id = ANY(%s)
+                    ) AND id > %s
+                    ORDER BY id
+                    LIMIT %s
+                ), inserted AS (
+                    INSERT INTO {self.model._meta.db_table}
+                        (user_id, recipe_id, author_id, pub_date)
+                    SELECT batch.user_id, recipe.id, recipe.author_id,
+                           recipe.pub_date
+                    FROM batch
+                    JOIN {Recipe._meta.db_table} recipe
+                      ON recipe.author_id = batch.author_id
+                    WHERE recipe.id = ANY(%s)
+                    ON CONFLICT (user_id, recipe_id) DO NOTHING
+                )
+                SELECT max(id) FROM batch
+            ''', [list(recipe_ids), after, limit, list(recipe_ids)])
+            return cursor.fetchone()[0]
+
+    def backfill(self, user_id, author_id, limit):
+        """Добавляет в ленту последние рецепты автора после подписки."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'''
+                INSERT INTO {self.model._meta.db_table}
+                    (user_id, recipe_id, author_id, pub_date)
+                SELECT %s, id, author_id, pub_date
+                FROM {Recipe._meta.db_table}
+                WHERE author_id = %s
+                ORDER BY pub_date DESC, id DESC
+                LIMIT %s
+                ON CONFLICT (user_id, recipe_id) DO NOTHING
+            ''', [user_id, author_id, limit])
+
+    def rebuild(self, limit, users=None):
+        """Заново собирает ленты пользователей users (набора id или
+        запроса) или всех пользователей: до limit последних рецептов
+        каждого автора, на которого подписан пользователь."""
+        table = self.model._meta.db_table
+        rows = self.all()
+        subscriptions = Subscribe.objects.all()
+        if users is not None:
+            rows = rows.filter(user__in=users)
+            subscriptions = subscriptions.filter(user__in=users)
+        rows.delete()
+        sql, params = subscriptions.order_by().values(
+            'id', 'user_id', 'author_id').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'''
+                INSERT INTO {table} (user_id, recipe_id, author_id, pub_date)
+                SELECT user_id, id, author_id, pub_date FROM (
+                    SELECT subscribe.user_id, recipe.id, recipe.author_id,
+                           recipe.pub_date,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY subscribe.id
+                               ORDER BY recipe.pub_date DESC, recipe.id DESC
+                           ) AS row_number
+                    FROM ({sql}) subscribe
+                    JOIN {Recipe._meta.db_table} recipe
+                      ON recipe.author_id = subscribe.author_id
+                ) ranked
+                WHERE row_number <= %s
+            ''', (*params, limit))
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписок пользователя.
+
+    Записи раскладываются при публикации рецепта, так что чтение ленты
+    сводится к диапазонному сканированию индекса по пользователю.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    objects = FeedEntryManager()
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        ordering = ('-pub_date', '-recipe')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique feed entry'),)
+        indexes = (
+            models.Index(fields=('user', '-pub_date', '-recipe'),
+                         name='feed_user_pub_date_idx'),
+            models.Index(fields=('user', 'author'),
+                         name='feed_user_author_idx'),
+        )
+
+
+class FeedFanOut(models.Model):
+    """Незавершённая фоновая раскладка рецептов по лентам.
+
+    after - id последней обработанной подписки. Запись удаляется после
+    последней пачки, поэтому оставшиеся после перезапуска процесса
+    записи дорабатывает команда resume_feed_fan_outs.
+    """
+    recipe_ids = ArrayField(models.BigIntegerField(),
+                            verbose_name='Рецепты')
+    after = models.BigIntegerField(
+        default=0, verbose_name='Последняя обработанная подписка')
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='Создана')
+
+    class Meta:
+        verbose_name = 'Раскладка по лентам'
+        verbose_name_plural = 'Раскладки по лентам'
+        ordering = ('id',)
@@ -1,9 +1,10 @@
 from django.contrib import admin
 
+from foodgram.admin import EstimatedCountAdmin
 from .models import Subscribe, User
 
 
-class UsersAdmin(admin.ModelAdmin):
+class UsersAdmin(EstimatedCountAdmin):
 
     def save_model(self, request, obj, form, change):
         obj.set_password(obj.password)
@@ -17,19 +18,20 @@ class UsersAdmin(admin.ModelAdmin):
         'last_name',
     )
     search_fields = ('email', 'username')
-    list_filter = ('email', 'username')
     empty_value_display = '-пусто-'
 
 
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(EstimatedCountAdmin):
     list_display: tuple = (
         'user',
         'author',
     )
+    list_select_related: tuple = ('user', 'author')
     search_fields: tuple = (
-        'user',
-        'author'
+        'user__username',
+        'author__username'
     )
+    raw_id_fields: tuple = ('user', 'author')
     empty_value_display: str = '-пусто-'
 
 
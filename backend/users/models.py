@@ -1,7 +1,8 @@
 
+from django.apps import apps
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
-from django.db import models
+from django.db import models, transaction
 
 from recipes.constants import USER_CREDENTIALS_MAX_LENGTH, USER_EMAIL_LENGTH
 from .validators import validate_username, validate_name
@@ -58,7 +59,31 @@ class User(AbstractUser):
         return self.username
 
 
+def feed_entries():
+    return apps.get_model('recipes', 'FeedEntry').objects
+
+
+class SubscribeQuerySet(models.QuerySet):
+
+    def delete(self):
+        """Удаляет подписки вместе с их записями в лентах одним
+        запросом на таблицу."""
+        with transaction.atomic(using=self.db, savepoint=False):
+            feed_entries().filter(models.Exists(self.filter(
+                user=models.OuterRef('user'),
+                author=models.OuterRef('author')
+            ))).delete()
+            return super().delete()
+
+
 class Subscribe(models.Model):
+    """Подписка на автора.
+
+    Записи ленты удаляются в delete() объекта и набора объектов, а не
+    в post_delete, чтобы подписки удалялись каскадом вместе с
+    пользователем без загрузки каждой строки. Записи ленты самого
+    пользователя удаляются тем же каскадом.
+    """
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -76,11 +101,17 @@ class Subscribe(models.Model):
         auto_now_add=True
     )
 
+    objects = SubscribeQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
         ordering = ('-id',)
         unique_together = ('user', 'author')
+        indexes = (
+            models.Index(fields=('author', 'user'),
+                         name='subscribe_author_user_idx'),
+        )
         constraints = (
             models.UniqueConstraint(
                 fields=('user', 'author'),
@@ -89,3 +120,9 @@ class Subscribe(models.Model):
     def __str__(self):
         return (f'Подписка пользователя {self.user.username}'
                 f' на пользователя {self.author.username}')
+
+    @transaction.atomic(savepoint=False)
+    def delete(self, *args, **kwargs):
+        feed_entries().filter(
+            user_id=self.user_id, author_id=self.author_id).delete()
+        return super().delete(*args, **kwargs)